@@ -0,0 +1,178 @@
+import sys
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+def approx_size(value):
+    """Rough deep size in bytes of plain str/dict/list values."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(v) for v in value)
+    return size
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-entry TTL and stale-while-revalidate.
+
+    Entries younger than `ttl` are fresh. Entries up to `ttl + stale_ttl` old
+    are returned immediately while a background task refreshes them.
+    With a shared `backend` (see backends.py), local misses are looked up
+    there before fetching, and fetched values are published to it.
+    Fetched values for which `cacheable(value)` is false are returned but not kept.
+    """
+
+    def __init__(self, ttl, stale_ttl=0, max_entries=1024, max_bytes=None, backend=None, namespace="cache", cacheable=None):
+        self.ttl = ttl
+        self.cacheable = cacheable or (lambda value: value is not None)
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (value, stored_at, size)
+        self._bytes = 0
+        self._refreshing = {}
+        self.backend = backend
+        self.namespace = namespace
+        self.hits = 0
+        self.shared_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, stored_at, _ = entry
+        if time.monotonic() - stored_at >= self.ttl + self.stale_ttl:
+            self._drop(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        size = approx_size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if key in self._data:
+            self._drop(key)
+        self._data[key] = (value, time.monotonic(), size)
+        self._bytes += size
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._data))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if key in self._data:
+            self._drop(key)
+
+    async def discard(self, key):
+        """Invalidate `key` locally and in the shared backend."""
+        self.invalidate(key)
+        if self.backend is not None:
+            await self.backend.delete(self._shared_key(key))
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Return the cached value for `key`, calling `fetch()` on a miss. `None` results are not cached.
+        If `fetch()` raises and an expired entry is still held, that entry is served instead.
+        """
+        expired = None
+        entry = self._data.get(key)
+        if entry is not None:
+            value, stored_at, _ = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._data.move_to_end(key)
+                self._refresh(key, fetch)
+                return value
+            expired = value
+
+        if self.backend is not None:
+            value = await self._shared_get(key)
+            if value is not None and self.cacheable(value):
+                self.shared_hits += 1
+                self.set(key, value)
+                return value
+
+        self.misses += 1
+        try:
+            value = await fetch()
+        except Exception:
+            if expired is None:
+                raise
+            self.stale_hits += 1
+            return expired
+        if self.cacheable(value):
+            self.set(key, value)
+            await self._shared_set(key, value)
+        return value
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshing),
+        }
+
+    def _drop(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _refresh(self, key, fetch):
+        if key in self._refreshing:
+            return
+        self._refreshing[key] = asyncio.create_task(self._run_refresh(key, fetch))
+
+    async def _run_refresh(self, key, fetch):
+        try:
+            value = await fetch()
+            if self.cacheable(value):
+                self.set(key, value)
+                await self._shared_set(key, value)
+        except Exception as e:
+            logging.warning(f"Background refresh failed for {key!r}: {e!r}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _shared_key(self, key):
+        return f"{self.namespace}:{json.dumps(key)}"
+
+    async def _shared_get(self, key):
+        try:
+            return await self.backend.get(self._shared_key(key))
+        except Exception as e:
+            logging.warning(f"Shared cache read failed for {key!r}: {e!r}")
+            return None
+
+    async def _shared_set(self, key, value):
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(self._shared_key(key), value, ttl=self.ttl + self.stale_ttl)
+        except Exception as e:
+            logging.warning(f"Shared cache write failed for {key!r}: {e!r}")
@@ -0,0 +1,154 @@
+import re
+import time
+import base64
+import hashlib
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    link TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    image TEXT,
+    details TEXT,
+    description TEXT,
+    info_hash TEXT,
+    magnet_link TEXT,
+    seen_at REAL NOT NULL,
+    detail_at REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, details, description,
+    content='posts', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts(rowid, title, details, description)
+    VALUES (new.rowid, new.title, new.details, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, title, details, description)
+    VALUES ('delete', old.rowid, old.title, old.details, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_au AFTER UPDATE ON posts BEGIN
+    INSERT INTO posts_fts(posts_fts, rowid, title, details, description)
+    VALUES ('delete', old.rowid, old.title, old.details, old.description);
+    INSERT INTO posts_fts(rowid, title, details, description)
+    VALUES (new.rowid, new.title, new.details, new.description);
+END;
+CREATE TABLE IF NOT EXISTS crawl_state (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS post_ids (id TEXT PRIMARY KEY, link TEXT NOT NULL);
+"""
+
+def post_id(link):
+    """Short, stable id of a post link (8 characters), as carried in result buttons."""
+    return base64.urlsafe_b64encode(hashlib.blake2b(link.encode(), digest_size=6).digest()).decode().rstrip("=")
+
+def _match_expression(query):
+    # Every word must appear (as a prefix), e.g. 'harry pot' -> '"harry"* "pot"*'
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query.lower()))
+
+class Catalog:
+    """
+    Local full-text index (SQLite FTS5) of every post the bot has scraped.
+
+    Search results and detail pages are upserted as they are seen; searches
+    rank matches with bm25, weighting titles above sizes and descriptions.
+    """
+
+    def __init__(self, path, page_size=10):
+        self.path = path
+        self.page_size = page_size
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def record_results(self, results):
+        now = time.time()
+        with self._lock, self._db() as conn:
+            conn.executemany(
+                "INSERT INTO posts (link, title, image, details, seen_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET "
+                "title = excluded.title, image = coalesce(excluded.image, image), "
+                "details = excluded.details, seen_at = excluded.seen_at",
+                [(r["link"], r["title"], r["image"], r["details"], now) for r in results]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO post_ids (id, link) VALUES (?, ?)",
+                [(post_id(r["link"]), r["link"]) for r in results]
+            )
+
+    def record_detail(self, link, data):
+        now = time.time()
+        with self._lock, self._db() as conn:
+            conn.execute(
+                "INSERT INTO posts (link, title, image, description, info_hash, magnet_link, seen_at, detail_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET "
+                "image = coalesce(image, excluded.image), description = excluded.description, "
+                "info_hash = excluded.info_hash, magnet_link = excluded.magnet_link, detail_at = excluded.detail_at",
+                (
+                    link, data["title"],
+                    data["image_url"] if data["image_url"] != "N/A" else None,
+                    data["description"], data.get("info_hash"), data["magnet_link"], now, now
+                )
+            )
+
+    def search(self, query, page=1):
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT p.title, p.link, p.image, p.details FROM posts_fts "
+                "JOIN posts p ON p.rowid = posts_fts.rowid "
+                "WHERE posts_fts MATCH ? ORDER BY bm25(posts_fts, 10.0, 2.0, 1.0) LIMIT ? OFFSET ?",
+                (expression, self.page_size, (page - 1) * self.page_size)
+            ).fetchall()
+        return [
+            {"title": title, "link": link, "image": image, "details": details or "Unknown size"}
+            for title, link, image, details in rows
+        ]
+
+    def known(self, links, with_detail=False):
+        """Return the subset of `links` already in the catalog (optionally only those with detail data)."""
+        links = list(links)
+        if not links:
+            return set()
+        marks = ",".join("?" * len(links))
+        extra = " AND detail_at IS NOT NULL" if with_detail else ""
+        with self._lock:
+            rows = self._db().execute(f"SELECT link FROM posts WHERE link IN ({marks}){extra}", links).fetchall()
+        return {row[0] for row in rows}
+
+    def link_for(self, post):
+        """The link whose post_id() is `post`, if this catalog has seen it."""
+        with self._lock:
+            row = self._db().execute("SELECT link FROM post_ids WHERE id = ?", (post,)).fetchone()
+        return row[0] if row else None
+
+    def get_state(self, key):
+        with self._lock:
+            row = self._db().execute("SELECT value FROM crawl_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key, value):
+        with self._lock, self._db() as conn:
+            if value is None:
+                conn.execute("DELETE FROM crawl_state WHERE key = ?", (key,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO crawl_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def count(self):
+        with self._lock:
+            return self._db().execute("SELECT count(*) FROM posts").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,54 @@
+import os
+import httpx
+
+# --- Shared HTTP client for all upstream scraping ---
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/114.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9"
+}
+
+TIMEOUT = httpx.Timeout(
+    float(os.getenv("HTTP_TIMEOUT", "15")),
+    connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+)
+LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "50")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=30
+)
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_client = None
+
+def get_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=TIMEOUT,
+            limits=LIMITS,
+            http2=HTTP2,
+            follow_redirects=True
+        )
+    return _client
+
+async def fetch(url, **kwargs):
+    return await get_client().get(url, **kwargs)
+
+def stream(url, **kwargs):
+    return get_client().stream("GET", url, **kwargs)
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
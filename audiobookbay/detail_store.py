@@ -0,0 +1,58 @@
+import json
+import time
+import sqlite3
+import threading
+
+class DetailStore:
+    """Persistent detail-page cache in a local SQLite file, keyed by post link."""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS details ("
+                "link TEXT PRIMARY KEY, info_hash TEXT, data TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS details_info_hash ON details (info_hash)")
+        return self._conn
+
+    def get(self, link):
+        with self._lock:
+            row = self._db().execute(
+                "SELECT data, fetched_at FROM details WHERE link = ?", (link,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, link, data):
+        with self._lock, self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO details (link, info_hash, data, fetched_at) VALUES (?, ?, ?, ?)",
+                (link, (data.get("info_hash") or "").lower() or None, json.dumps(data), time.time())
+            )
+
+    def invalidate(self, link=None, info_hash=None):
+        """Delete entries matching `link` or `info_hash`; returns the removed links."""
+        if link is not None:
+            where, arg = "link = ?", link
+        elif info_hash is not None:
+            where, arg = "info_hash = ?", info_hash.lower()
+        else:
+            return []
+        with self._lock, self._db() as conn:
+            links = [r[0] for r in conn.execute(f"SELECT link FROM details WHERE {where}", (arg,))]
+            conn.execute(f"DELETE FROM details WHERE {where}", (arg,))
+        return links
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -226,7 +226,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # Then continue to search logic...
     user_states[user_id] = {'query': query, 'page': 1}
-    results = search_audiobookbay(query, 1)
+    results = await search_audiobookbay(query, 1)
 
     if not results:
         await update.message.reply_text("No results found.")
@@ -264,7 +264,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         _, idx = query_data.split("|")
         idx = int(idx)
         result = state['results'][idx]
-        data = get_magnet_data(result['link'])
+        data = await get_magnet_data(result['link'])
         state['selected_data'] = data
 
         title = data.get("title", "")
@@ -315,7 +315,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.callback_query.answer()
         return
 
-    results = search_audiobookbay(state['query'], state['page'])
+    results = await search_audiobookbay(state['query'], state['page'])
     state['results'] = results
     await update.callback_query.message.edit_text(
         f"🔍 Search Results for '{state['query']}' (Page {state['page']}):",
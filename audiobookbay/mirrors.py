@@ -0,0 +1,186 @@
+import os
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit
+import httpx
+from audiobookbay.client import fetch
+from audiobookbay.resilience import CircuitBreaker, AdaptiveLimiter, SourceUnavailable, CLOSED
+from metrics import stage
+
+# Statuses that mean "this mirror is blocked or broken", not "this page is missing"
+FAILOVER_STATUSES = {403, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET = int(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+LIMIT_INITIAL = int(os.getenv("UPSTREAM_CONCURRENCY", "8"))
+LIMIT_MAX = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "32"))
+LIMIT_TARGET_LATENCY = float(os.getenv("UPSTREAM_TARGET_LATENCY", "3"))
+
+class Mirror:
+    __slots__ = ("url", "latency", "failures", "down_until", "breaker", "limiter")
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.latency = None  # EWMA of request latency in seconds
+        self.failures = 0
+        self.down_until = 0.0  # soft cooldown: only affects ranking
+        self.breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+        self.limiter = AdaptiveLimiter(initial=LIMIT_INITIAL, max_limit=LIMIT_MAX, target_latency=LIMIT_TARGET_LATENCY)
+
+class MirrorPool:
+    """
+    Pool of interchangeable audiobookbay domains.
+
+    Requests go to the healthy mirror with the lowest EWMA latency and fail
+    over to the next one on connection errors or blocking statuses. Links are
+    always built on the first (canonical) mirror, so cache keys and stored
+    links stay stable whichever mirror served them.
+    """
+
+    def __init__(self, urls, alpha=0.3, cooldown=60, probe_interval=60):
+        self.mirrors = [Mirror(url) for url in urls if url.strip()]
+        self.primary = self.mirrors[0].url
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.failovers = 0
+        self._task = None
+
+    def ranked(self):
+        now = time.monotonic()
+        up = [m for m in self.mirrors if m.down_until <= now]
+        down = [m for m in self.mirrors if m.down_until > now]
+        # Unmeasured mirrors keep their configured order behind measured ones;
+        # mirrors in cooldown are still tried last rather than failing outright
+        up.sort(key=lambda m: m.latency if m.latency is not None else float("inf"))
+        down.sort(key=lambda m: m.down_until)
+        return up + down
+
+    def path(self, url):
+        parts = urlsplit(url)
+        return parts.path + (f"?{parts.query}" if parts.query else "")
+
+    def healthy(self):
+        """True while at least one mirror's circuit is closed."""
+        return any(m.breaker.state == CLOSED for m in self.mirrors)
+
+    async def call(self, path, fn):
+        """
+        Run `fn(url)` against each mirror in turn until one succeeds.
+
+        Mirrors whose circuit is open are skipped; raises SourceUnavailable
+        when every mirror is skipped or fails.
+        """
+        last_error = None
+        for mirror in self.ranked():
+            if not mirror.breaker.allow():
+                continue
+            started = None
+            outcome = None
+            try:
+                # Inside the try: a call cancelled while queued must still abandon a half-open trial
+                await mirror.limiter.acquire()
+                started = time.monotonic()
+                with stage("fetch", url=mirror.url + path):
+                    result = await fn(mirror.url + path)
+                outcome = True
+            except httpx.TransportError as e:
+                last_error, outcome = e, False
+            except httpx.HTTPStatusError as e:
+                # Any other status means the host is up and answering
+                outcome = e.response.status_code not in FAILOVER_STATUSES
+                if outcome:
+                    raise
+                last_error = e
+            finally:
+                elapsed = time.monotonic() - started if started is not None else 0.0
+                if outcome is None:
+                    mirror.breaker.abandon()
+                    if started is not None:
+                        await mirror.limiter.release(elapsed, True)
+                else:
+                    await mirror.limiter.release(elapsed, outcome)
+                    if outcome:
+                        mirror.breaker.record_success()
+                    else:
+                        mirror.breaker.record_failure()
+            if outcome:
+                self._succeeded(mirror, elapsed)
+                return result
+            self._failed(mirror, last_error)
+            self.failovers += 1
+        raise SourceUnavailable(f"No mirror could serve {path}") from last_error
+
+    async def get(self, path):
+        async def attempt(url):
+            response = await fetch(url)
+            if response.status_code in FAILOVER_STATUSES:
+                response.raise_for_status()
+            return response
+        return await self.call(path, attempt)
+
+    def start(self):
+        if self._task is None and self.probe_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        now = time.monotonic()
+        return [
+            {
+                "url": m.url,
+                "latency_ms": round(m.latency * 1000) if m.latency is not None else None,
+                "up": m.down_until <= now,
+                "failures": m.failures,
+                "circuit": m.breaker.state,
+                "concurrency": int(m.limiter.limit),
+            }
+            for m in self.mirrors
+        ]
+
+    def _succeeded(self, mirror, elapsed):
+        if mirror.latency is None:
+            mirror.latency = elapsed
+        else:
+            mirror.latency = self.alpha * elapsed + (1 - self.alpha) * mirror.latency
+        mirror.failures = 0
+        mirror.down_until = 0.0
+
+    def _failed(self, mirror, error):
+        mirror.failures += 1
+        # Back off longer on mirrors that keep failing, capped at 16 cooldowns
+        mirror.down_until = time.monotonic() + self.cooldown * min(2 ** (mirror.failures - 1), 16)
+        logging.warning(f"Mirror {mirror.url} failed ({mirror.failures}x): {error!r}")
+
+    async def _probe(self, mirror):
+        started = time.monotonic()
+        try:
+            response = await fetch(mirror.url + "/")
+        except httpx.HTTPError as e:
+            self._failed(mirror, e)
+            return
+        if response.status_code in FAILOVER_STATUSES:
+            self._failed(mirror, f"status {response.status_code}")
+        else:
+            self._succeeded(mirror, time.monotonic() - started)
+
+    async def _run(self):
+        while True:
+            await asyncio.gather(*(self._probe(m) for m in self.mirrors))
+            await asyncio.sleep(self.probe_interval)
+
+# Comma-separated; the first mirror is the canonical host used in result links
+mirrors = MirrorPool(
+    os.getenv("MIRRORS", "https://audiobookbay.lu").split(","),
+    cooldown=int(os.getenv("MIRROR_COOLDOWN", "60")),
+    probe_interval=int(os.getenv("MIRROR_PROBE_INTERVAL", "60"))
+)
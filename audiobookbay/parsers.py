@@ -0,0 +1,298 @@
+import os
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    HAVE_LXML = True
+    _LXML_PARSER = lxml.html.HTMLParser(huge_tree=True)
+except ImportError:
+    HAVE_LXML = False
+
+# --- Search results page parsers ---
+# Both backends return the same list of {title, link, image, details} dicts.
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+_POSTS = f"//div[{_has_class('post')}]"
+_TITLE = f".//div[{_has_class('postTitle')}]//h2//a"
+_IMAGE = f".//div[{_has_class('postContent')}]//img"
+_SIZE = f".//div[{_has_class('postContent')}]//p[contains(@style, 'text-align:center;')]"
+
+def parse_results_lxml(html, base_url):
+    # huge_tree lifts libxml2's 256-level nesting limit, past which it silently stops parsing
+    tree = lxml.html.document_fromstring(html, parser=_LXML_PARSER)
+    results = []
+    for post in tree.xpath(_POSTS):
+        title_tags = post.xpath(_TITLE)
+        if not title_tags:
+            continue
+        title_tag = title_tags[0]
+
+        img_tags = post.xpath(_IMAGE)
+        size_tags = post.xpath(_SIZE)
+        results.append({
+            "title": title_tag.text_content().strip(),
+            "link": base_url + title_tag.get("href"),
+            "image": img_tags[0].get("src") if img_tags else None,
+            "details": size_tags[0].text_content().strip().replace("\n", " ") if size_tags else "Unknown size"
+        })
+    return results
+
+def parse_results_soup(html, base_url):
+    soup = BeautifulSoup(html, "html.parser")
+    results = []
+    for post in soup.select("div.post"):
+        title_tag = post.select_one("div.postTitle h2 a")
+        if not title_tag:
+            continue
+
+        title = title_tag.text.strip()
+        link = base_url + title_tag.get("href")
+
+        img_tag = post.select_one("div.postContent img")
+        img = img_tag.get("src") if img_tag else None
+
+        size_tag = post.select_one("div.postContent p[style*='text-align:center;']")
+        size = size_tag.text.strip().replace("\n", " ") if size_tag else "Unknown size"
+
+        results.append({
+            "title": title,
+            "link": link,
+            "image": img,
+            "details": size
+        })
+    return results
+
+BACKENDS = {"soup": parse_results_soup}
+if HAVE_LXML:
+    BACKENDS["lxml"] = parse_results_lxml
+
+_backend = os.getenv("HTML_PARSER", "auto")
+if _backend not in BACKENDS:
+    _backend = "lxml" if HAVE_LXML else "soup"
+
+def parse_search_results(html, base_url, backend=None):
+    parse = BACKENDS[backend or _backend]
+    try:
+        return parse(html, base_url)
+    except ValueError:
+        # lxml rejects str input carrying an XML encoding declaration
+        if parse is parse_results_soup:
+            raise
+        return parse_results_soup(html, base_url)
+
+# --- Detail page parsers ---
+# Both return {title, image_url, description, info_hash, trackers}.
+
+def _is_cover(src):
+    return 'm.media-amazon.com' in src or src.endswith(('.jpg', '.jpeg', '.png'))
+
+def parse_detail_soup(html):
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Title
+    title_tag = soup.find('h1')
+    title = title_tag.get_text(strip=True) if title_tag else 'N/A'
+
+    # Image
+    image_url = 'N/A'
+    img_tag = soup.find('img', attrs={'itemprop': 'image'})
+    if img_tag and img_tag.has_attr('src'):
+        image_url = img_tag['src']
+    else:
+        for img in soup.find_all('img'):
+            src = img.get('src', '')
+            if _is_cover(src):
+                image_url = src
+                break
+
+    # Description
+    desc_tag = soup.find(class_='desc')
+    description = desc_tag.get_text(strip=True) if desc_tag else 'N/A'
+
+    # Info Hash and Trackers
+    info_hash = None
+    trackers = []
+    for row in soup.find_all('tr'):
+        cols = row.find_all('td')
+        if len(cols) == 2:
+            key = cols[0].get_text(strip=True)
+            value = cols[1].get_text(strip=True)
+            if "Info Hash" in key:
+                info_hash = value
+            elif "Tracker" in key or value.startswith(("udp://", "http://", "https://")):
+                trackers.append(value)
+
+    return {
+        "title": title,
+        "image_url": image_url,
+        "description": description,
+        "info_hash": info_hash,
+        "trackers": trackers
+    }
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+}
+
+class DetailPageParser(HTMLParser):
+    """
+    Incremental detail page parser fed chunk by chunk while the page downloads.
+
+    `complete` turns true once the title, cover, description and the whole
+    table holding the info hash (with its tracker rows) have been seen, so the
+    caller can stop reading the response.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.image_url = None
+        self.fallback_image = None
+        self.description = None
+        self.info_hash = None
+        self.trackers = []
+        self._stack = []
+        self._captures = []  # [depth, kind, text pieces]
+        self._rows = []  # [depth, cells]
+        self._seen_itemprop = False
+        self._hash_table = None
+        self._hash_done = False
+        self._raw_text = 0  # inside <script>/<style>
+        self._text = []  # raw data of the current text node; feed() boundaries split it
+
+    @property
+    def complete(self):
+        return (
+            self.title is not None
+            and self.description is not None
+            and self._hash_done
+            and (self.image_url or self.fallback_image) is not None
+        )
+
+    def result(self):
+        return {
+            "title": self.title if self.title is not None else 'N/A',
+            "image_url": self.image_url or self.fallback_image or 'N/A',
+            "description": self.description if self.description is not None else 'N/A',
+            "info_hash": self.info_hash,
+            "trackers": self.trackers
+        }
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        self._pop_to(0)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        attrs = dict(attrs)
+        if tag == "img":
+            self._image(attrs)
+        if tag in VOID_TAGS:
+            return
+        if tag in ("tr", "td"):
+            self._close_implicit(tag)
+
+        self._stack.append(tag)
+        depth = len(self._stack)
+        capturing = {c[1] for c in self._captures}
+        if tag == "h1" and self.title is None and "h1" not in capturing:
+            self._captures.append([depth, "h1", []])
+        if self.description is None and "desc" not in capturing and "desc" in (attrs.get("class") or "").split():
+            self._captures.append([depth, "desc", []])
+        if tag == "tr":
+            self._rows.append([depth, []])
+        elif tag == "td" and self._rows:
+            self._captures.append([depth, "td", []])
+        elif tag in ("script", "style"):
+            self._raw_text += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_text()
+        if tag == "img":
+            self._image(dict(attrs))
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i] == tag:
+                self._pop_to(i)
+                return
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_data(self, data):
+        if self._raw_text or not self._captures:
+            return
+        self._text.append(data)
+
+    def _flush_text(self):
+        # Strip once per text node, like get_text(strip=True), not once per fed chunk
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text = []
+        if text:
+            for capture in self._captures:
+                capture[2].append(text)
+
+    def _image(self, attrs):
+        src = attrs.get("src")
+        if attrs.get("itemprop") == "image" and not self._seen_itemprop:
+            self._seen_itemprop = True
+            if "src" in attrs:
+                self.image_url = src or ""
+        if self.fallback_image is None and _is_cover(src or ""):
+            self.fallback_image = src
+
+    def _close_implicit(self, tag):
+        # A new <td> ends an unclosed cell of the current row; a new <tr> ends an unclosed row of the current table
+        stop = "tr" if tag == "td" else "table"
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i] == stop:
+                return
+            if self._stack[i] == tag:
+                self._pop_to(i)
+                return
+
+    def _pop_to(self, index):
+        while len(self._stack) > index:
+            depth = len(self._stack)
+            tag = self._stack.pop()
+            while self._captures and self._captures[-1][0] == depth:
+                _, kind, pieces = self._captures.pop()
+                self._finish_capture(kind, "".join(pieces))
+            if tag == "tr" and self._rows and self._rows[-1][0] == depth:
+                self._finish_row(self._rows.pop()[1])
+            elif tag == "table" and self._hash_table == depth:
+                self._hash_done = True
+            elif tag in ("script", "style"):
+                self._raw_text -= 1
+
+    def _finish_capture(self, kind, text):
+        if kind == "h1":
+            self.title = text
+        elif kind == "desc":
+            self.description = text
+        elif kind == "td" and self._rows:
+            self._rows[-1][1].append(text)
+
+    def _finish_row(self, cells):
+        if len(cells) != 2:
+            return
+        key, value = cells
+        if "Info Hash" in key:
+            if self.info_hash is None:
+                tables = [i for i, t in enumerate(self._stack) if t == "table"]
+                if tables:
+                    self._hash_table = tables[-1] + 1
+                else:
+                    self._hash_done = True
+            self.info_hash = value
+        elif "Tracker" in key or value.startswith(("udp://", "http://", "https://")):
+            self.trackers.append(value)
@@ -0,0 +1,81 @@
+import os
+import asyncio
+import contextvars
+import logging
+from audiobookbay.search import search_audiobookbay
+from magnet_scraper import get_magnet_data
+from images import images
+
+class Prefetcher:
+    """
+    Warms the search, detail and cover caches in the background after a results page is shown.
+
+    Each session owns at most one batch of prefetch tasks; scheduling a new batch
+    for the same session cancels the previous one. All sessions share one
+    concurrency budget so prefetching never crowds out live requests; jobs that
+    don't fit in it are dropped rather than queued, since they'd be stale by then.
+    """
+
+    def __init__(self, concurrency=8, top_k=3):
+        self.top_k = top_k
+        self.concurrency = concurrency
+        self._running = 0
+        self._tasks = {}
+        self.started = 0
+        self.cancelled = 0
+        self.skipped = 0
+
+    def schedule(self, session, query, page, results):
+        self.cancel(session)
+        if not results:
+            return
+        # Most useful first: the next page, then the top results
+        jobs = [lambda: search_audiobookbay(query, page + 1)]
+        jobs += [lambda link=r["link"]: self._warm_detail(link) for r in results[:self.top_k]]
+        room = max(0, self.concurrency - self._running)
+        self.skipped += max(0, len(jobs) - room)
+        if not room:
+            return
+        tasks = self._tasks[session] = set()
+        for job in jobs[:room]:
+            # A fresh context, so prefetch work isn't attributed to the handler that scheduled it
+            task = asyncio.create_task(self._run(job), context=contextvars.Context())
+            task.add_done_callback(lambda t, s=session: self._discard(s, t))
+            tasks.add(task)
+        self._running += len(tasks)
+        self.started += len(tasks)
+
+    def cancel(self, session):
+        for task in self._tasks.pop(session, ()):
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+    def pending(self):
+        return sum(len(tasks) for tasks in self._tasks.values())
+
+    async def _warm_detail(self, link):
+        details = await get_magnet_data(link)
+        await images.get(details["image_url"])
+
+    async def _run(self, job):
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.debug(f"Prefetch failed: {e!r}")
+
+    def _discard(self, session, task):
+        # Runs for finished and cancelled tasks alike, so the budget slot is always returned
+        self._running -= 1
+        tasks = self._tasks.get(session)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._tasks[session]
+
+prefetcher = Prefetcher(
+    concurrency=int(os.getenv("PREFETCH_CONCURRENCY", "8")),
+    top_k=int(os.getenv("PREFETCH_TOP_K", "3"))
+)
@@ -0,0 +1,90 @@
+import time
+import asyncio
+
+class SourceUnavailable(Exception):
+    """Raised when no upstream host can currently serve a request."""
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests are refused outright. After `reset_timeout` seconds one trial
+    request is let through (half-open); its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self._state = CLOSED
+
+    @property
+    def state(self):
+        if self._state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def allow(self):
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self.trial_running:
+            self._state = HALF_OPEN
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.trial_running = False
+        self._state = CLOSED
+
+    def abandon(self):
+        """The admitted request ended without an outcome (e.g. it was cancelled)."""
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._state = OPEN
+            self.opened_at = time.monotonic()
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: grows by ~1 per `limit` fast successes and halves on
+    an error or a response slower than `target_latency` (at most once per
+    `target_latency` seconds, so one slow burst counts as one signal).
+    """
+
+    def __init__(self, initial=8, min_limit=1, max_limit=64, target_latency=3.0, backoff=0.5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.in_flight = 0
+        self._decreased_at = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency, ok):
+        async with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if not ok or latency > self.target_latency:
+                if now - self._decreased_at >= self.target_latency:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._decreased_at = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
@@ -1,55 +1,113 @@
-import requests
-from bs4 import BeautifulSoup
+import os
+import asyncio
 from urllib.parse import quote_plus
+from audiobookbay.cache import TTLCache
+from audiobookbay.catalog import Catalog
+from backends import shared_backend
+from audiobookbay.mirrors import mirrors
+from audiobookbay.resilience import SourceUnavailable
+from audiobookbay.parsers import parse_search_results
+from audiobookbay.singleflight import upstream
+from metrics import stage
 
-def search_audiobookbay(query, page=1):
-    query = query.lower()
-    encoded_query = quote_plus(query)
-    base_url = "https://audiobookbay.lu"  # Try changing this if needed
-    search_url = f"{base_url}/page/{page}/?s={encoded_query}&cat=undefined%2Cundefined"
-
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/114.0.0.0 Safari/537.36"
-        ),
-        "Accept-Language": "en-US,en;q=0.9"
-    }
-
-    print(f"[🔍] Fetching: {search_url}")
-    response = requests.get(search_url, headers=headers)
-    print(f"[🌐] Status Code: {response.status_code}")
+# --- Result cache keyed by normalized (query, page) ---
+search_cache = TTLCache(
+    ttl=int(os.getenv("SEARCH_CACHE_TTL", "600")),
+    stale_ttl=int(os.getenv("SEARCH_CACHE_STALE_TTL", "3600")),
+    max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000")),
+    max_bytes=int(os.getenv("SEARCH_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    backend=shared_backend,
+    namespace="search"
+)
 
-    if response.status_code != 200:
-        print("[❌] Failed to fetch page.")
-        return []
+# --- Local catalog of every scraped post ---
+# off: always search live; first: answer from the catalog when it has at least
+# CATALOG_MIN_RESULTS hits for the query, going live for pages it can't fill;
+# merge: catalog hits followed by live results.
+# The source is chosen once per query and each page's answer is cached, so a
+# page renders the same list (and the same button order) until the entry expires.
+CATALOG_MODE = os.getenv("CATALOG_MODE", "first")
+CATALOG_MIN_RESULTS = int(os.getenv("CATALOG_MIN_RESULTS", "5"))
+catalog = Catalog(
+    os.getenv("CATALOG_PATH", "catalog.sqlite3"),
+    page_size=int(os.getenv("CATALOG_PAGE_SIZE", "10"))
+)
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    posts = soup.select("div.post")
+def normalize_query(query):
+    return " ".join(query.lower().split())
 
-    print(f"[📄] Found {len(posts)} posts")
+async def search_audiobookbay(query, page=1):
+    query = normalize_query(query)
+    try:
+        results = await search_cache.get_or_fetch((query, page), lambda: _answer(query, page))
+    except SourceUnavailable:
+        local = await _local_fallback(query, page)
+        if local:
+            return local
+        raise
+    if results is None:
+        # Upstream failed: whatever the catalog knows is better than nothing (not cached)
+        return await _local_fallback(query, page)
+    return results
 
-    results = []
-    for post in posts:
-        title_tag = post.select_one("div.postTitle h2 a")
-        if not title_tag:
-            continue
+async def _answer(query, page):
+    if CATALOG_MODE == "off":
+        return await _fetch_results(query, page)
+    source = await search_cache.get_or_fetch((query, "source"), lambda: _choose_source(query))
+    local = []
+    if source == "catalog" or CATALOG_MODE == "merge":
+        local = await asyncio.to_thread(catalog.search, query, page)
+        if source == "catalog" and len(local) >= catalog.page_size:
+            return local
+    # Live, merged, or a catalog page that ran short: the site may know more than was
+    # ever scraped, so pagination carries on live instead of ending at the catalog
+    results = await _fetch_results(query, page)
+    if results is None:
+        return None
+    seen = {r["link"] for r in local}
+    return local + [r for r in results if r["link"] not in seen]
 
-        title = title_tag.text.strip()
-        link = base_url + title_tag.get("href")
+async def _choose_source(query):
+    # Decided from the first page so every page of a query comes from the same place
+    if CATALOG_MODE == "first":
+        local = await asyncio.to_thread(catalog.search, query, 1)
+        if len(local) >= CATALOG_MIN_RESULTS:
+            return "catalog"
+    return "live"
 
-        img_tag = post.select_one("div.postContent img")
-        img = img_tag.get("src") if img_tag else None
+async def _local_fallback(query, page):
+    if CATALOG_MODE == "off":
+        return []
+    return await asyncio.to_thread(catalog.search, query, page)
 
-        size_tag = post.select_one("div.postContent p[style*='text-align:center;']")
-        size = size_tag.text.strip().replace("\n", " ") if size_tag else "Unknown size"
+async def _fetch_results(query, page):
+    encoded_query = quote_plus(query)
+    search_path = f"/page/{page}/?s={encoded_query}&cat=undefined%2Cundefined"
+    return await upstream.do(search_path, lambda: _scrape_results(search_path))
+
+async def fetch_listing(page=1):
+    """Scrape one page of the site's newest posts (uncached); None if the fetch failed."""
+    listing_path = f"/page/{page}/"
+    return await upstream.do(listing_path, lambda: _scrape_results(listing_path))
+
+async def _scrape_results(path):
+    print(f"[🔍] Fetching: {path}")
+    try:
+        response = await mirrors.get(path)
+    except SourceUnavailable as e:
+        print(f"[❌] Source unavailable: {e}")
+        raise
+    print(f"[🌐] Status Code: {response.status_code} from {response.url.host}")
 
-        results.append({
-            "title": title,
-            "link": link,
-            "image": img,
-            "details": size
-        })
+    if response.status_code != 200:
+        print("[❌] Failed to fetch page.")
+        return None
 
+    # Parsing is CPU-bound; keep it off the event loop thread.
+    # Links are built on the canonical mirror, whichever mirror answered.
+    with stage("parse"):
+        results = await asyncio.to_thread(parse_search_results, response.text, mirrors.primary)
+    print(f"[📄] Found {len(results)} posts")
+    if results:
+        await asyncio.to_thread(catalog.record_results, results)
     return results
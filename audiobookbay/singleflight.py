@@ -0,0 +1,43 @@
+import asyncio
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight task.
+
+    Callers are shielded from each other: cancelling one waiter (e.g. a
+    cancelled prefetch) does not cancel the shared work for the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.executed = 0
+        self.deduplicated = 0
+
+    async def do(self, key, fn):
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._inflight),
+        }
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every waiter went away
+
+upstream = SingleFlight()
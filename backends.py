@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+
+# --- Shared key/value backends ---
+# Values are JSON-serializable; every backend supports a per-key TTL in seconds.
+# sqlite:///path is shared by processes on one host
+# (and is the stand-in used for local runs and tests), redis://... is shared across hosts.
+
+class SQLiteBackend:
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)")
+        return self._conn
+
+    def _get(self, key):
+        with self._lock:
+            row = self._db().execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def _set(self, key, value, ttl):
+        with self._lock, self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                conn.execute("DELETE FROM kv WHERE expires < ?", (time.time(),))
+
+    def _delete(self, key):
+        with self._lock, self._db() as conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    async def get(self, key):
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key, value, ttl=None):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key):
+        await asyncio.to_thread(self._delete, key)
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class RedisBackend:
+    def __init__(self, url):
+        import redis.asyncio  # optional dependency, only needed for redis:// backends
+        self._redis = redis.asyncio.from_url(url)
+
+    async def get(self, key):
+        raw = await self._redis.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key, value, ttl=None):
+        await self._redis.set(key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    async def delete(self, key):
+        await self._redis.delete(key)
+
+    async def close(self):
+        await self._redis.aclose()
+
+def get_backend(url):
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported SHARED_BACKEND: {url}")
+
+# Unset means no shared tier: each process keeps only its in-process caches
+SHARED_BACKEND = os.getenv("SHARED_BACKEND", "")
+shared_backend = get_backend(SHARED_BACKEND) if SHARED_BACKEND else None
@@ -0,0 +1,87 @@
+import os
+import re
+
+# --- HTML fixtures ---
+# All fixtures are synthetic. The small pages in fixtures/ are hand-written to follow
+# the markup the parsers rely on (post/postTitle/postContent blocks, the h1, the
+# itemprop cover, the desc div and the torrent_info table), with made-up titles such
+# as "Book & Tale N - Author N"; they are not captures of the live site, so markup
+# changes upstream won't show up here. The large and pathological pages are
+# generated from them so the repo stays small.
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def _read(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+def _posts(html):
+    start = html.index('<div class="post">')
+    end = html.index('<div class="navigation">')
+    return html[:start], html[start:end], html[end:]
+
+def _renumber(block, n):
+    return re.sub(r"book-\d+|Tale \d+|Author \d+|/I/\d+\.jpg", lambda m: re.sub(r"\d+", str(n), m.group()), block)
+
+def _comments(count):
+    return "".join(
+        f'<div class="comment"><p>comment {i} lorem ipsum dolor sit amet</p>'
+        f'<img src="/av/{i}.gif"><table><tr><td>a</td><td>b</td></tr></table></div>\n'
+        for i in range(count)
+    )
+
+def search_large(posts=400):
+    head, block, tail = _posts(_read("search_small.html"))
+    one = block.split('<div class="post">')[1]
+    return head + "".join(_renumber('<div class="post">' + one, n) for n in range(posts)) + tail
+
+def search_pathological(posts=400):
+    head, block, tail = _posts(_read("search_small.html"))
+    one = block.split('<div class="post">')[1]
+    decoy = "<script>var tpl = '" + '<div class=\\"post\\">' * 2000 + "';</script>"
+    broken = (
+        '<div class="post"><div class="postTitle"><h2><a href="/abss/broken/">No cover, no size</a></h2></div>'
+        '<div class="postContent"><p>Posted: never</p></div></div>'
+    )
+    nested = "<div><span>" * 200 + "deep" + "</span></div>" * 200
+    entities = "&amp;&nbsp;&eacute;&#8211;&bogus; " * 2000
+    body = "".join(
+        _renumber('<div class="post">' + one, n) if n % 10 else broken
+        for n in range(posts)
+    )
+    return head + decoy + nested + f"<p>{entities}</p>" + body + tail
+
+def detail_small():
+    return _read("detail_small.html")
+
+def detail_large(comments=3000):
+    html = detail_small()
+    start = html.index('<div id="comments">')
+    return html[:start] + '<div id="comments">\n' + _comments(comments) + "</div></body></html>"
+
+def detail_pathological(comments=3000):
+    # No itemprop cover (forces the fallback scan), unclosed paragraphs in a huge
+    # description, and the info hash table only after thousands of comments
+    html = detail_small().replace('itemprop="image" ', "")
+    table_start = html.index('<table class="torrent_info">')
+    table_end = html.index("</table>", table_start) + len("</table>")
+    table = html[table_start:table_end]
+    html = html[:table_start] + html[table_end:]
+    description = "<p>unclosed paragraph &mdash; " * 3000
+    html = html.replace('<div class="desc">', '<div class="desc">' + description, 1)
+    start = html.index('<div id="comments">')
+    return html[:start] + '<div id="comments">\n' + _comments(comments) + "</div>" + table + "</body></html>"
+
+def search_pages():
+    return {
+        "small": _read("search_small.html"),
+        "large": search_large(),
+        "pathological": search_pathological(),
+    }
+
+def detail_pages():
+    return {
+        "small": detail_small(),
+        "large": detail_large(),
+        "pathological": detail_pathological(),
+    }
@@ -0,0 +1,343 @@
+"""
+Offline benchmarks for scraping, parsing and the handler flow.
+
+    python -m benchmarks.run --out before.json
+    ... change something ...
+    python -m benchmarks.run --out after.json --compare before.json
+
+Everything runs against generated fixtures served by a local stub site and a
+fake Telegram bot; no network, Telegram or MongoDB access is needed.
+"""
+import os
+import sys
+import json
+import time
+import types
+import asyncio
+import logging
+import argparse
+import contextlib
+import platform
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+
+from benchmarks import fixtures
+from benchmarks.stub_server import StubSite
+
+def _configure(site_url, workdir):
+    # Must run before the bot modules are imported: they read settings at import time
+    os.environ.update({
+        "MIRRORS": site_url,
+        "MIRROR_PROBE_INTERVAL": "0",
+        "CATALOG_PATH": os.path.join(workdir, "catalog.sqlite3"),
+        "DETAIL_STORE_PATH": ":memory:",
+        "IMAGE_PIPELINE": "0",
+        "ADMISSION_USER_BURST": "1000000",
+        "ADMISSION_GLOBAL_BURST": "1000000",
+        "CRAWLER_ENABLED": "0",
+    })
+    os.environ.pop("SHARED_BACKEND", None)
+    for name, value in {
+        "BOT_TOKEN": "0:benchmark", "LOG_CHANNEL": "-1", "REQUEST_GROUP": "-2",
+        "ADMINS": "1", "MONGO_URI": "mongodb://127.0.0.1:1",
+    }.items():
+        os.environ.setdefault(name, value)
+
+# --- Measurement ---
+class Recorder:
+    def __init__(self, repeat, only=None):
+        self.repeat = repeat
+        self.only = only
+        self.results = {}
+        self.checks = {}
+
+    async def bench(self, name, fn, repeat=None):
+        """Time `fn()` (sync or async), then run it once more under tracemalloc."""
+        if self.only and not any(part in name for part in self.only):
+            return
+        repeat = repeat or self.repeat
+        await _call(fn)  # warm-up
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await _call(fn)
+            times.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        await _call(fn)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        times.sort()
+        self.results[name] = {
+            "runs": repeat,
+            "min_ms": round(times[0], 3),
+            "median_ms": round(statistics.median(times), 3),
+            "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+            "peak_kib": round((peak - before) / 1024, 1),
+            "retained_kib": round((current - before) / 1024, 1),
+        }
+        print(f"{name:<48} {self.results[name]['median_ms']:>10.3f} ms  {self.results[name]['peak_kib']:>10.1f} KiB peak", file=sys.stderr)
+
+    def check(self, name, ok):
+        self.checks[name] = bool(ok)
+        if not ok:
+            print(f"CHECK FAILED: {name}", file=sys.stderr)
+
+async def _call(fn):
+    result = fn()
+    if asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+# --- Fake Telegram objects for the handler flow ---
+class FakeMessage:
+    def __init__(self, sent, text=None, user_id=1000):
+        self.sent = sent
+        self.text = text
+        self.id = self.message_id = 1
+        self.from_user = types.SimpleNamespace(id=user_id, username="bench", first_name="Bench")
+        self.photo = ()
+
+    async def reply_text(self, text, **kwargs):
+        self.sent.append(("text", text, kwargs.get("reply_markup")))
+        return FakeMessage(self.sent)
+
+    async def edit_text(self, text, **kwargs):
+        self.sent.append(("edit", text, kwargs.get("reply_markup")))
+        return FakeMessage(self.sent)
+
+    async def reply_photo(self, photo=None, **kwargs):
+        self.sent.append(("photo", photo, kwargs.get("reply_markup")))
+        message = FakeMessage(self.sent)
+        message.photo = (types.SimpleNamespace(file_id=f"file-{hash(photo)}"),)
+        return message
+
+class FakeCallbackQuery:
+    def __init__(self, sent, data, user_id=1000):
+        self.data = data
+        self.from_user = types.SimpleNamespace(id=user_id)
+        self.message = FakeMessage(sent, user_id=user_id)
+        self.sent = sent
+
+    async def answer(self, text=None, **kwargs):
+        if text:
+            self.sent.append(("answer", text, None))
+
+class FakeBot:
+    def __init__(self, sent):
+        self.sent = sent
+
+    async def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append(("send", text, None))
+
+    async def forward_message(self, **kwargs):
+        self.sent.append(("forward", None, None))
+
+def _patch_db(db):
+    # In-memory replacements for the Mongo calls made on the search path
+    handles, covers = {}, {}
+
+    async def save_query_handle(handle, query):
+        handles[handle] = query
+
+    async def get_query_handle(handle):
+        return handles.get(handle)
+
+    async def get_cover_file_id(key):
+        return covers.get(key)
+
+    async def save_cover_file_id(key, file_id):
+        covers[key] = file_id
+
+    async def delete_cover_file_id(key):
+        covers.pop(key, None)
+
+    db.save_query_handle = save_query_handle
+    db.get_query_handle = get_query_handle
+    db.get_cover_file_id = get_cover_file_id
+    db.save_cover_file_id = save_cover_file_id
+    db.delete_cover_file_id = delete_cover_file_id
+
+# --- Benchmarks ---
+async def run(recorder, site):
+    import db
+    import main
+    import magnet_scraper
+    from audiobookbay import parsers, search
+    from audiobookbay.mirrors import mirrors
+    _patch_db(db)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    search_pages = fixtures.search_pages()
+    detail_pages = fixtures.detail_pages()
+    base = mirrors.primary
+
+    # Parsing
+    for name, html in search_pages.items():
+        lxml_results = parsers.parse_results_lxml(html, base)
+        soup_results = parsers.parse_results_soup(html, base)
+        recorder.check(f"search.{name}.lxml_matches_soup", lxml_results == soup_results)
+        await recorder.bench(f"parse.search.{name}.lxml", lambda html=html: parsers.parse_results_lxml(html, base))
+        await recorder.bench(f"parse.search.{name}.soup", lambda html=html: parsers.parse_results_soup(html, base))
+
+    def incremental(html):
+        parser = parsers.DetailPageParser()
+        parser.feed(html)
+        parser.close()
+        return parser.result()
+
+    for name, html in detail_pages.items():
+        recorder.check(f"detail.{name}.incremental_matches_soup", incremental(html) == parsers.parse_detail_soup(html))
+        await recorder.bench(f"parse.detail.{name}.soup", lambda html=html: parsers.parse_detail_soup(html))
+        await recorder.bench(f"parse.detail.{name}.incremental", lambda html=html: incremental(html))
+
+    # Fetch + parse through the real client, mirror pool and parsers
+    for name in search_pages:
+        await recorder.bench(f"fetch.search.{name}", lambda name=name: search._scrape_results(f"/page/1/?s={name}"))
+
+    for name in detail_pages:
+        url = f"{base}/abss/{name}/"
+        magnet_scraper.STREAMING = True
+        streamed = await magnet_scraper._scrape_magnet_data(url)
+        await recorder.bench(f"fetch.detail.{name}.streaming", lambda url=url: magnet_scraper._scrape_magnet_data(url))
+        magnet_scraper.STREAMING = False
+        full = await magnet_scraper._scrape_magnet_data(url)
+        await recorder.bench(f"fetch.detail.{name}.full", lambda url=url: magnet_scraper._scrape_magnet_data(url))
+        recorder.check(f"detail.{name}.streaming_matches_full", streamed == full)
+    magnet_scraper.STREAMING = True
+
+    # Keyboard rendering
+    handle = "benchmrk"
+    for name in ("small", "large"):
+        results = parsers.parse_search_results(search_pages[name], base)
+        await recorder.bench(f"keyboard.{name}", lambda results=results: main.get_keyboard(results, 2, handle))
+
+    # Full handler flow: search -> next page -> pick a result -> magnet link, with the
+    # default catalog mode and prefetching. The stub serves the small page for any
+    # query, and the fetch benchmarks above have already put its posts in the catalog,
+    # so searching "tale" is answered from the catalog.
+    shown, opened = [], []
+    get_magnet_data = main.get_magnet_data
+
+    async def spy(link):
+        opened.append(link)
+        return await get_magnet_data(link)
+
+    main.get_magnet_data = spy
+
+    def opened_shown_post():
+        # Fixture post N is titled "Book & Tale N – Author N" and lives at /abss/book-N/
+        # (picking a result and asking for its magnet both open it)
+        return bool(opened) and all(link.rstrip("/").endswith(f"book-{shown[0].split()[3]}") for link in opened)
+
+    async def flow(cold):
+        if cold:
+            search.search_cache.clear()
+            magnet_scraper.detail_cache.clear()
+            magnet_scraper.detail_store.close()  # a fresh :memory: store on next use
+        sent = []
+        shown.clear()
+        opened.clear()
+        context = types.SimpleNamespace(bot=FakeBot(sent), user_data={})
+        message = FakeMessage(sent, text="tale")
+        await main.handle_message(types.SimpleNamespace(
+            message=message, effective_chat=types.SimpleNamespace(id=1000), callback_query=None
+        ), context)
+        markup = sent[-1][2]
+        for step in ("next", "select", "magnet"):
+            buttons = [b.callback_data for row in markup.inline_keyboard for b in row if b.callback_data]
+            data = {"next": buttons[-1], "select": buttons[0]}.get(step) or buttons[0]
+            if step == "select":
+                shown.append(markup.inline_keyboard[0][0].text)
+            await main.handle_callback(types.SimpleNamespace(
+                callback_query=FakeCallbackQuery(sent, data), message=None,
+                effective_chat=types.SimpleNamespace(id=1000)
+            ), context)
+            markup = sent[-1][2]
+        main.prefetcher.cancel(1000)
+        return sent
+
+    sent = await flow(cold=True)
+    kinds = [kind for kind, _, _ in sent if kind != "send"]
+    recorder.check("handler.flow_replies", kinds == ["text", "edit", "photo", "text"])
+    recorder.check("handler.flow_opens_shown_post", opened_shown_post())
+    await recorder.bench("handler.flow.cold", lambda: flow(cold=True))
+    await recorder.bench("handler.flow.warm", lambda: flow(cold=False))
+
+    from audiobookbay.client import close_client
+    await close_client()
+
+# --- Reporting ---
+def _meta(site):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stub_latency_ms": site.latency * 1000,
+    }
+
+def compare(baseline, current, threshold):
+    """Print median changes per benchmark; return the names that regressed beyond `threshold`."""
+    regressions = []
+    print(f"\n{'benchmark':<48} {'before':>10} {'after':>10} {'change':>8}", file=sys.stderr)
+    for name, after in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        change = (after["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  <-- slower"
+        print(f"{name:<48} {before['median_ms']:>10.3f} {after['median_ms']:>10.3f} {change:>+8.1%}{flag}", file=sys.stderr)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per benchmark")
+    parser.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of latency the stub site adds")
+    parser.add_argument("--out", help="write JSON results to this file ('-' for stdout)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="median slowdown counted as a regression")
+    args = parser.parse_args()
+
+    site = StubSite(latency=args.latency).start()
+    workdir = tempfile.mkdtemp(prefix="abb-bench-")
+    _configure(site.url, workdir)
+    recorder = Recorder(args.repeat, args.only)
+    try:
+        # The scrapers print progress; keep stdout clean for --out -
+        with contextlib.redirect_stdout(sys.stderr):
+            asyncio.run(run(recorder, site))
+    finally:
+        site.stop()
+
+    report = {"meta": _meta(site), "results": recorder.results, "checks": recorder.checks}
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+    elif args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [name for name, ok in recorder.checks.items() if not ok]
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+    if failed or regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
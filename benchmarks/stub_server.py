@@ -0,0 +1,62 @@
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from benchmarks import fixtures
+
+# --- Local stand-in for the audiobookbay site ---
+# /page/N/?s=<fixture name>  -> that search fixture (newest-posts listing if no ?s=)
+# /abss/<fixture name>/      -> that detail fixture (the small one for any other post)
+
+class StubSite:
+    def __init__(self, latency=0.0):
+        self.latency = latency  # seconds added to every response, to mimic a remote host
+        self.search = {k: v.encode() for k, v in fixtures.search_pages().items()}
+        self.detail = {k: v.encode() for k, v in fixtures.detail_pages().items()}
+        self.requests = 0
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # otherwise delayed ACKs add ~40ms per response
+
+            def do_GET(self):
+                site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                body = site.page(self.path)
+                self.send_response(200 if body is not None else 404)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body or b"")))
+                self.end_headers()
+                self.wfile.write(body or b"")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def page(self, path):
+        parts = urlsplit(path)
+        if parts.path.startswith("/abss/"):
+            return self.detail.get(parts.path.strip("/").split("/")[-1], self.detail["small"])
+        if parts.path == "/" or parts.path.startswith("/page/"):
+            name = parse_qs(parts.query).get("s", ["small"])[0]
+            return self.search.get(name, self.search["small"])
+        return None
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,155 @@
+import os
+import time
+import asyncio
+import logging
+from telegram.error import RetryAfter, Forbidden, BadRequest, TelegramError
+import db
+from ratelimit import TokenBucket
+from user_buffer import user_buffer
+
+# --- Config ---
+RATE = float(os.getenv("BROADCAST_RATE", "25"))  # messages/second, Telegram allows ~30 globally
+CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "500"))
+PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", "10"))
+MAX_ATTEMPTS = 3
+
+UNREACHABLE = ("chat not found", "user is deactivated", "bot was blocked", "bot can't initiate")
+
+class Broadcaster:
+    """
+    Sends a message to every reachable user as a resumable background job.
+
+    Users are read in `_id` order in batches. After each batch the job document
+    stores the last `_id` and counters, so a restarted bot resumes from there.
+    Users who blocked the bot or deleted their account get `blocked: True`
+    and are skipped by later broadcasts.
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket(RATE)
+        self._tasks = {}
+
+    async def start(self, bot, admin_chat_id, text):
+        total = await db.count_reachable_users()
+        progress = await bot.send_message(admin_chat_id, f"📣 Broadcast queued for {total} users…")
+        job = {
+            "text": text,
+            "admin_chat_id": admin_chat_id,
+            "progress_message_id": progress.message_id,
+            "status": "running",
+            "last_id": None,
+            "total": total,
+            "sent": 0,
+            "failed": 0,
+            "blocked": 0,
+            "created_at": time.time()
+        }
+        job["_id"] = await db.create_broadcast(job)
+        self._spawn(bot, job)
+        return job
+
+    async def resume(self, bot):
+        jobs = await db.running_broadcasts()
+        for job in jobs:
+            if job["_id"] not in self._tasks:
+                logging.info(f"Resuming broadcast {job['_id']} after user {job['last_id']}")
+                self._spawn(bot, job)
+        return len(jobs)
+
+    def running(self):
+        return len(self._tasks)
+
+    def _spawn(self, bot, job):
+        task = asyncio.create_task(self._run(bot, job))
+        self._tasks[job["_id"]] = task
+        task.add_done_callback(lambda t: self._tasks.pop(job["_id"], None))
+
+    async def _run(self, bot, job):
+        limit = asyncio.Semaphore(CONCURRENCY)
+        last_report = time.monotonic()
+        try:
+            while True:
+                batch = await db.reachable_user_ids(after=job["last_id"], limit=BATCH_SIZE)
+                if not batch:
+                    break
+                outcomes = await asyncio.gather(*(self._send(bot, limit, uid, job["text"]) for uid in batch))
+
+                blocked = [uid for uid, outcome in zip(batch, outcomes) if outcome == "blocked"]
+                if blocked:
+                    await db.mark_users_blocked(blocked)
+                    user_buffer.forget(blocked)
+                job["sent"] += outcomes.count("sent")
+                job["failed"] += outcomes.count("failed")
+                job["blocked"] += len(blocked)
+                job["last_id"] = batch[-1]
+                await self._checkpoint(job)
+
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    await self._report(bot, job)
+                    last_report = time.monotonic()
+            job["status"] = "done"
+        except asyncio.CancelledError:
+            raise  # stays "running" and is resumed on the next start
+        except Exception as e:
+            logging.exception(f"Broadcast {job['_id']} failed")
+            job["status"] = "failed"
+            job["error"] = repr(e)
+
+        await self._checkpoint(job, finished_at=time.time())
+        await self._report(bot, job)
+        await self._notify(bot, job["admin_chat_id"], self._summary(job))
+
+    async def _send(self, bot, limit, user_id, text):
+        async with limit:
+            for _ in range(MAX_ATTEMPTS):
+                await self.bucket.acquire()
+                try:
+                    await bot.send_message(user_id, text)
+                    return "sent"
+                except RetryAfter as e:
+                    # Flood control applies to the whole bot, so every sender waits
+                    self.bucket.pause(e.retry_after)
+                except Forbidden:
+                    return "blocked"
+                except BadRequest as e:
+                    return "blocked" if any(s in e.message.lower() for s in UNREACHABLE) else "failed"
+                except TelegramError as e:
+                    logging.warning(f"Broadcast to {user_id} failed: {e}")
+                    await asyncio.sleep(1)
+            return "failed"
+
+    async def _checkpoint(self, job, **extra):
+        fields = {k: job[k] for k in ("status", "last_id", "sent", "failed", "blocked")}
+        fields.update(extra)
+        if "error" in job:
+            fields["error"] = job["error"]
+        await db.update_broadcast(job["_id"], fields)
+
+    async def _report(self, bot, job):
+        try:
+            await bot.edit_message_text(
+                self._summary(job),
+                chat_id=job["admin_chat_id"],
+                message_id=job["progress_message_id"]
+            )
+        except TelegramError as e:
+            logging.debug(f"Progress update skipped: {e}")
+
+    async def _notify(self, bot, chat_id, text):
+        try:
+            await bot.send_message(chat_id, text)
+        except TelegramError as e:
+            logging.warning(f"Failed to send broadcast summary: {e}")
+
+    @staticmethod
+    def _summary(job):
+        done = job["sent"] + job["failed"] + job["blocked"]
+        status = {"running": "in progress", "done": "finished", "failed": "stopped with an error"}[job["status"]]
+        return (
+            f"📣 Broadcast {status}\n\n"
+            f"📊 Processed: {done}/{job['total']}\n"
+            f"✅ Sent: {job['sent']}\n"
+            f"🚫 Blocked/deactivated: {job['blocked']}\n"
+            f"❌ Failed: {job['failed']}"
+        )
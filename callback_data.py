@@ -0,0 +1,65 @@
+import os
+import hmac
+import base64
+import hashlib
+from collections import namedtuple
+import db
+from audiobookbay.cache import TTLCache
+from audiobookbay.catalog import post_id
+from audiobookbay.search import normalize_query
+
+# --- Stateless, signed callback_data ---
+# Format: "<action>|<handle>|<page>|<index>|<post>|<sig>", well under Telegram's 64-byte limit.
+# The handle names a normalized query in a shared table, so any worker can serve any button press.
+# <post> is a short hash of the result's link (catalog.post_id); it is resolved through the
+# catalog, or found on the re-fetched page, so a button never opens a different post.
+SHOW_PAGE, SELECT, MAGNET = "p", "s", "m"
+ACTIONS = (SHOW_PAGE, SELECT, MAGNET)
+
+SECRET = (os.getenv("CALLBACK_SECRET") or os.getenv("BOT_TOKEN") or "").encode()
+
+CallbackData = namedtuple("CallbackData", "action handle page index post")
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _sign(payload):
+    return _b64(hmac.new(SECRET, payload.encode(), hashlib.sha256).digest()[:6])
+
+def query_handle(query):
+    return _b64(hashlib.blake2b(normalize_query(query).encode(), digest_size=6).digest())
+
+def encode(action, handle, page, index=0, post=""):
+    payload = f"{action}|{handle}|{page}|{index}|{post}"
+    return f"{payload}|{_sign(payload)}"
+
+def decode(data):
+    """Parse and verify callback_data; returns None for legacy, malformed or forged data."""
+    parts = (data or "").split("|")
+    if len(parts) != 6:
+        return None
+    action, handle, page, index, post, sig = parts
+    if action not in ACTIONS or not page.isdigit() or not index.isdigit():
+        return None
+    if not hmac.compare_digest(sig, _sign("|".join(parts[:5]))):
+        return None
+    return CallbackData(action, handle, int(page), int(index), post)
+
+class QueryHandles:
+    """Maps short handles to queries: in-process LRU in front of a Mongo table shared by all workers."""
+
+    def __init__(self, ttl=7 * 24 * 3600, max_entries=100000):
+        self._local = TTLCache(ttl=ttl, max_entries=max_entries)
+
+    async def remember(self, query):
+        query = normalize_query(query)
+        handle = query_handle(query)
+        if self._local.get(handle) is None:
+            await db.save_query_handle(handle, query)
+            self._local.set(handle, query)
+        return handle
+
+    async def resolve(self, handle):
+        return await self._local.get_or_fetch(handle, lambda: db.get_query_handle(handle))
+
+query_handles = QueryHandles(ttl=int(os.getenv("QUERY_HANDLE_TTL", str(7 * 24 * 3600))))
@@ -0,0 +1,59 @@
+import os
+import asyncio
+import logging
+from pymongo.errors import PyMongoError
+import db
+
+class ConfigCache:
+    """
+    In-memory copy of the welcome message and the latest extra link.
+
+    Admin writes bump a shared version counter in the settings collection and
+    reload this process at once; other processes poll only that counter and
+    reload when it moves.
+    """
+
+    def __init__(self, poll_interval=30):
+        self.poll_interval = poll_interval
+        self.version = None
+        self.welcome_message = None
+        self.extra_link = None
+        self._task = None
+
+    async def load(self):
+        version = await db.get_config_version()
+        self.welcome_message = await db.get_welcome_message()
+        self.extra_link = await db.latest_extra_link()
+        self.version = version
+
+    async def invalidate(self):
+        """Call after an admin write: publishes a new version and reloads this process."""
+        await db.bump_config_version()
+        await self.load()
+
+    async def check(self):
+        if await db.get_config_version() != self.version:
+            await self.load()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.check()
+            except PyMongoError as e:
+                logging.warning(f"Config version check failed: {e}")
+
+config_cache = ConfigCache(poll_interval=float(os.getenv("CONFIG_POLL_INTERVAL", "30")))
@@ -0,0 +1,88 @@
+import os
+import logging
+from telegram.error import BadRequest
+import db
+from audiobookbay.cache import TTLCache
+from images import images
+
+# --- Cover photo file_id cache ---
+# Telegram returns a file_id for every photo it stores; sending that id again
+# skips the re-download from the original host. Ids are keyed by image URL
+# (one cover is often shared by several posts) and kept in Mongo so every
+# worker and every restart reuses them.
+
+PLACEHOLDER_KEY = "placeholder"
+
+class CoverCache:
+    def __init__(self, placeholder=None, max_entries=20000):
+        self.placeholder = placeholder  # URL or local file used when a post has no usable cover
+        self._local = TTLCache(ttl=30 * 24 * 3600, max_entries=max_entries)
+        self.reused = 0
+        self.uploaded = 0
+
+    async def file_id(self, key):
+        return await self._local.get_or_fetch(key, lambda: db.get_cover_file_id(key))
+
+    async def remember(self, key, file_id):
+        self._local.set(key, file_id)
+        await db.save_cover_file_id(key, file_id)
+
+    async def forget(self, key):
+        self._local.invalidate(key)
+        await db.delete_cover_file_id(key)
+
+    async def send(self, message, image_url, caption, **kwargs):
+        """Reply with the cover (or the placeholder) as a photo; falls back to a text reply."""
+        if image_url and image_url != "N/A":
+            sent = await self._send_photo(message, image_url, image_url, caption, **kwargs)
+            if sent is not None:
+                return sent
+        if self.placeholder:
+            sent = await self._send_photo(message, PLACEHOLDER_KEY, self.placeholder, caption, **kwargs)
+            if sent is not None:
+                if image_url and image_url != "N/A" and sent.photo:
+                    # Dead cover: use the placeholder for it until this process restarts
+                    self._local.set(image_url, sent.photo[-1].file_id)
+                return sent
+        return await message.reply_text(caption, **kwargs)
+
+    async def _send_photo(self, message, key, source, caption, **kwargs):
+        file_id = await self.file_id(key)
+        if file_id is not None:
+            try:
+                sent = await message.reply_photo(photo=file_id, caption=caption, **kwargs)
+                self.reused += 1
+                return sent
+            except BadRequest as e:
+                # A file_id Telegram no longer accepts; upload from the source again
+                logging.warning(f"Cached cover {key} rejected: {e}")
+                await self.forget(key)
+        try:
+            if source.startswith(("http://", "https://")):
+                photo = source
+                if images.enabled:
+                    # Upload a downscaled local copy rather than have Telegram fetch the original
+                    photo = await images.get(source)
+                    if photo is None:
+                        logging.warning(f"Cover {key} could not be downloaded")
+                        return None
+                sent = await message.reply_photo(photo=photo, caption=caption, **kwargs)
+            else:
+                with open(source, "rb") as f:
+                    sent = await message.reply_photo(photo=f, caption=caption, **kwargs)
+        except BadRequest as e:
+            # Dead image host or unsupported format
+            logging.warning(f"Cover {key} could not be sent: {e}")
+            return None
+        self.uploaded += 1
+        if sent.photo:
+            await self.remember(key, sent.photo[-1].file_id)
+        return sent
+
+    def stats(self):
+        return {"cached": len(self._local), "reused": self.reused, "uploaded": self.uploaded}
+
+cover_cache = CoverCache(
+    placeholder=os.getenv("PLACEHOLDER_COVER") or None,
+    max_entries=int(os.getenv("COVER_CACHE_MAX_ENTRIES", "20000"))
+)
@@ -0,0 +1,103 @@
+import os
+import time
+import asyncio
+import logging
+from audiobookbay.search import catalog, fetch_listing
+from magnet_scraper import get_magnet_data
+from ratelimit import TokenBucket
+
+# --- Background crawler ---
+# Walks the newest-post listing pages, newest first, scraping the detail pages the
+# catalog lacks, until it meets `stop_after` already-known posts in a row. A few known
+# posts (e.g. ones users opened) don't end the pass, so a sparse catalog still backfills.
+# The page being crawled is checkpointed in the catalog, so a restart resumes there.
+
+class Crawler:
+    def __init__(self, interval, max_pages, concurrency, rate, stop_after=20):
+        self.interval = interval
+        self.max_pages = max_pages
+        self.stop_after = stop_after
+        self.bucket = TokenBucket(rate)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task = None
+        self.pages = 0
+        self.details = 0
+        self.failures = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def crawl(self):
+        """Run one incremental pass; returns the number of new posts found."""
+        page = int(await asyncio.to_thread(catalog.get_state, "resume_page") or 1)
+        found = 0
+        known_run = 0
+        while page <= self.max_pages:
+            await self.bucket.acquire()
+            results = await fetch_listing(page)
+            if results is None:
+                return found  # keep the checkpoint, retry from this page next pass
+            self.pages += 1
+
+            known = await asyncio.to_thread(catalog.known, [r["link"] for r in results], True)
+            fresh = [r for r in results if r["link"] not in known]
+            await asyncio.gather(*(self._fetch_detail(r["link"]) for r in fresh))
+            found += len(fresh)
+
+            for r in results:
+                known_run = known_run + 1 if r["link"] in known else 0
+            if not results or known_run >= self.stop_after:
+                break  # caught up with what we already have
+            page += 1
+            await asyncio.to_thread(catalog.set_state, "resume_page", page)
+
+        await asyncio.to_thread(catalog.set_state, "resume_page", None)
+        await asyncio.to_thread(catalog.set_state, "last_pass", time.time())
+        return found
+
+    def stats(self):
+        return {"pages": self.pages, "details": self.details, "failures": self.failures}
+
+    async def _fetch_detail(self, link):
+        async with self._semaphore:
+            await self.bucket.acquire()
+            try:
+                data = await get_magnet_data(link)
+            except Exception as e:
+                self.failures += 1
+                logging.warning(f"Crawler failed to fetch {link}: {e!r}")
+                return
+        if not data["info_hash"]:
+            self.failures += 1  # left unknown, so a later pass retries it
+            return
+        # Detail data served from the SQLite store is not recorded by get_magnet_data
+        await asyncio.to_thread(catalog.record_detail, link, data)
+        self.details += 1
+
+    async def _run(self):
+        while True:
+            try:
+                found = await self.crawl()
+                logging.info(f"Crawler pass done, {found} new posts")
+            except Exception as e:
+                logging.warning(f"Crawler pass failed: {e!r}")
+            await asyncio.sleep(self.interval)
+
+CRAWLER_ENABLED = os.getenv("CRAWLER_ENABLED", "0") == "1"
+crawler = Crawler(
+    interval=int(os.getenv("CRAWLER_INTERVAL", "900")),
+    max_pages=int(os.getenv("CRAWLER_MAX_PAGES", "50")),
+    concurrency=int(os.getenv("CRAWLER_CONCURRENCY", "2")),
+    rate=float(os.getenv("CRAWLER_RATE", "1")),
+    stop_after=int(os.getenv("CRAWLER_STOP_AFTER_KNOWN", "20"))
+)
@@ -0,0 +1,154 @@
+import os
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, ReturnDocument, UpdateOne
+from metrics import MongoTimer
+
+# --- Async MongoDB data layer ---
+# Every handler goes through these coroutines so no Mongo round trip blocks the event loop.
+load_dotenv()
+
+client = AsyncMongoClient(
+    os.getenv("MONGO_URI"),
+    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+    minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "2")),
+    maxIdleTimeMS=int(os.getenv("MONGO_MAX_IDLE_MS", "60000")),
+    serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    connectTimeoutMS=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    waitQueueTimeoutMS=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    event_listeners=[MongoTimer()]
+)
+db = client.audiobookbot
+users_collection = db.users
+custom_responses = db.custom_responses
+extra_links_collection = db.extra_links
+settings = db.settings
+broadcasts_collection = db.broadcasts
+query_handles_collection = db.query_handles
+covers_collection = db.covers
+
+QUERY_HANDLE_EXPIRY = int(os.getenv("QUERY_HANDLE_EXPIRY", str(30 * 24 * 3600)))
+
+async def ensure_indexes():
+    await query_handles_collection.create_index("used_at", expireAfterSeconds=QUERY_HANDLE_EXPIRY)
+
+# --- Users ---
+async def count_users():
+    return await users_collection.estimated_document_count()
+
+async def upsert_users(profiles):
+    """Bulk upsert `{user_id: (username, first_name)}` in one unordered round trip."""
+    await users_collection.bulk_write([
+        UpdateOne(
+            {"_id": user_id},
+            {
+                "$set": {"username": username, "first_name": first_name},
+                "$unset": {"blocked": ""}
+            },
+            upsert=True
+        )
+        for user_id, (username, first_name) in profiles.items()
+    ], ordered=False)
+
+async def find_user_id(username):
+    user = await users_collection.find_one({"username": username}, {"_id": 1})
+    return user["_id"] if user else None
+
+async def count_reachable_users():
+    return await users_collection.count_documents({"blocked": {"$ne": True}})
+
+async def reachable_user_ids(after=None, limit=500):
+    query = {"blocked": {"$ne": True}}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    cursor = users_collection.find(query, {"_id": 1}).sort("_id", 1).limit(limit)
+    return [user["_id"] async for user in cursor]
+
+async def mark_users_blocked(user_ids):
+    await users_collection.update_many({"_id": {"$in": user_ids}}, {"$set": {"blocked": True}})
+
+# --- Settings ---
+async def get_welcome_message():
+    doc = await settings.find_one({"name": "welcome"}, {"message": 1})
+    return doc["message"] if doc else None
+
+async def set_welcome_message(message):
+    await settings.update_one({"name": "welcome"}, {"$set": {"message": message}}, upsert=True)
+
+async def get_config_version():
+    doc = await settings.find_one({"name": "config_version"}, {"version": 1})
+    return doc["version"] if doc else 0
+
+async def bump_config_version():
+    doc = await settings.find_one_and_update(
+        {"name": "config_version"},
+        {"$inc": {"version": 1}},
+        projection={"version": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+# --- Custom Responses ---
+async def list_custom_responses():
+    return await custom_responses.find({}, {"_id": 0, "keyword": 1, "response": 1, "match": 1}).to_list(None)
+
+async def set_custom_response(keyword, response, match="exact"):
+    await custom_responses.update_one(
+        {"keyword": keyword},
+        {"$set": {"response": response, "match": match}},
+        upsert=True
+    )
+
+async def watch_custom_responses():
+    return await custom_responses.watch()
+
+# --- Extra Links ---
+async def add_extra_link(text, link):
+    await extra_links_collection.insert_one({"text": text, "link": link})
+
+async def remove_extra_link(text):
+    result = await extra_links_collection.delete_one({"text": text})
+    return result.deleted_count
+
+async def list_extra_links():
+    return await extra_links_collection.find({}, {"_id": 0, "text": 1, "link": 1}).to_list(None)
+
+async def latest_extra_link():
+    return await extra_links_collection.find_one({}, {"_id": 0, "text": 1, "link": 1}, sort=[("_id", -1)])
+
+# --- Query Handles ---
+async def save_query_handle(handle, query):
+    await query_handles_collection.update_one(
+        {"_id": handle},
+        {"$set": {"query": query}, "$currentDate": {"used_at": True}},
+        upsert=True
+    )
+
+async def get_query_handle(handle):
+    doc = await query_handles_collection.find_one({"_id": handle}, {"query": 1})
+    return doc["query"] if doc else None
+
+# --- Cover file_ids ---
+async def get_cover_file_id(key):
+    doc = await covers_collection.find_one({"_id": key}, {"file_id": 1})
+    return doc["file_id"] if doc else None
+
+async def save_cover_file_id(key, file_id):
+    await covers_collection.update_one({"_id": key}, {"$set": {"file_id": file_id}}, upsert=True)
+
+async def delete_cover_file_id(key):
+    await covers_collection.delete_one({"_id": key})
+
+# --- Broadcast Jobs ---
+async def create_broadcast(job):
+    result = await broadcasts_collection.insert_one(job)
+    return result.inserted_id
+
+async def update_broadcast(job_id, fields):
+    await broadcasts_collection.update_one({"_id": job_id}, {"$set": fields})
+
+async def running_broadcasts():
+    return await broadcasts_collection.find({"status": "running"}).to_list(None)
+
+async def close():
+    await client.close()
@@ -0,0 +1,166 @@
+import os
+import io
+import asyncio
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+import httpx
+from audiobookbay.client import stream
+from audiobookbay.singleflight import SingleFlight
+
+try:
+    from PIL import Image  # optional: without Pillow covers are sent by URL
+except ImportError:
+    Image = None
+
+# --- Cover image pipeline ---
+# Downloads covers once, downscales them to Telegram-friendly JPEGs and keeps
+# them in a size-bounded on-disk LRU cache, so cards are uploaded from local
+# bytes instead of Telegram fetching multi-megabyte originals from slow hosts.
+
+CARD_SIZE = (800, 800)  # bounding box of the photo on a result card
+
+class ImagePipeline:
+    def __init__(self, cache_dir, max_bytes, concurrency=4, max_source_bytes=15 * 1024 * 1024, quality=85, enabled=True):
+        self._enabled = enabled
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_source_bytes = max_source_bytes
+        self.quality = quality
+        self._budget = asyncio.Semaphore(concurrency)
+        self._flight = SingleFlight()
+        self._files = None  # name -> size, least recently used first
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self._enabled and Image is not None
+
+    async def get(self, url):
+        """JPEG bytes of `url` resized for a result card, or None if it can't be downloaded or decoded."""
+        if not self.enabled or not url or url == "N/A":
+            return None
+        name = f"{hashlib.sha1(url.encode()).hexdigest()}.jpg"
+        data = await asyncio.to_thread(self._read, name)
+        if data is not None:
+            self.hits += 1
+            return data
+        self.misses += 1
+        return await self._flight.do(name, lambda: self._produce(url, name))
+
+    def stats(self):
+        return {
+            "files": len(self._files or ()),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "evictions": self.evictions,
+        }
+
+    async def _produce(self, url, name):
+        async with self._budget:
+            original = await self._download(url)
+            if original is None:
+                self.failures += 1
+                return None
+            try:
+                data = await asyncio.to_thread(self._resize, original, CARD_SIZE)
+            except Exception as e:  # PIL raises a variety of errors on bad input
+                logging.warning(f"Could not decode cover {url}: {e!r}")
+                self.failures += 1
+                return None
+        await asyncio.to_thread(self._write, name, data)
+        return data
+
+    async def _download(self, url):
+        chunks, size = [], 0
+        try:
+            async with stream(url) as response:
+                if response.status_code != 200:
+                    return None
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > self.max_source_bytes:
+                        return None
+                    chunks.append(chunk)
+        except httpx.HTTPError as e:
+            logging.warning(f"Could not download cover {url}: {e!r}")
+            return None
+        return b"".join(chunks)
+
+    def _resize(self, original, size):
+        image = Image.open(io.BytesIO(original))
+        image.draft("RGB", size)  # lets JPEG decode at a reduced scale
+        image = image.convert("RGB")
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=self.quality, optimize=True)
+        return out.getvalue()
+
+    # --- On-disk LRU (runs in worker threads) ---
+    def _index(self):
+        if self._files is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+            entries.sort()
+            self._files = OrderedDict((name, size) for _, name, size in entries)
+            self._bytes = sum(self._files.values())
+        return self._files
+
+    def _read(self, name):
+        with self._lock:
+            files = self._index()
+            if name not in files:
+                return None
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except FileNotFoundError:  # evicted by another worker process
+                self._bytes -= files.pop(name)
+                return None
+            files.move_to_end(name)
+            return data
+
+    def _write(self, name, data):
+        path = os.path.join(self.cache_dir, name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._track(name, len(data))
+
+    def _track(self, name, size):
+        files = self._index()
+        if name in files:
+            self._bytes -= files.pop(name)
+        files[name] = size
+        self._bytes += size
+        while self._bytes > self.max_bytes and len(files) > 1:
+            oldest, size = files.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.cache_dir, oldest))
+            except FileNotFoundError:
+                pass
+
+images = ImagePipeline(
+    os.getenv("COVER_CACHE_DIR", "cover_cache"),
+    max_bytes=int(os.getenv("COVER_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    concurrency=int(os.getenv("COVER_DOWNLOAD_CONCURRENCY", "4")),
+    enabled=os.getenv("IMAGE_PIPELINE", "1") == "1"
+)
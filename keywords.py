@@ -0,0 +1,150 @@
+import os
+import asyncio
+import logging
+from collections import deque
+from pymongo.errors import PyMongoError
+import db
+
+EXACT, PREFIX, CONTAINS = "exact", "prefix", "contains"
+MODES = (EXACT, PREFIX, CONTAINS)
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+class Automaton:
+    """Aho-Corasick automaton: finds every occurrence of every pattern in one pass over the text."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for pattern in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][ch] = nxt
+                node = nxt
+            self._out[node] += (pattern,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def search(self, text):
+        """Yield `(start, pattern)` for every match."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern in self._out[node]:
+                yield i - len(pattern) + 1, pattern
+
+def parse_keyword(text):
+    """Split an admin-entered keyword such as `contains: harry potter` into `(keyword, mode)`."""
+    mode, sep, rest = text.partition(":")
+    if sep and mode.strip().lower() in MODES and rest.strip():
+        return normalize(rest), mode.strip().lower()
+    return normalize(text), EXACT
+
+def _bounded(text, start, end):
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+class KeywordIndex:
+    """
+    In-memory custom-response index.
+
+    Each keyword has a match mode: `exact` (the whole message), `prefix` (the
+    message starts with the keyword) or `contains` (the keyword appears
+    anywhere as whole words). An exact match wins over a prefix match, which
+    wins over a contained one; longer keywords win within a mode.
+    """
+
+    def __init__(self, poll_interval=60):
+        self.poll_interval = poll_interval
+        self._rules = {}
+        self._automaton = Automaton(())
+        self._task = None
+
+    def __len__(self):
+        return len(self._rules)
+
+    def load(self, docs):
+        rules = {}
+        for doc in docs:
+            keyword = normalize(doc.get("keyword", ""))
+            if keyword:
+                mode = doc.get("match", EXACT)
+                rules[keyword] = (mode if mode in MODES else EXACT, doc.get("response", ""))
+        self._automaton = Automaton(rules)
+        self._rules = rules
+
+    def match(self, text):
+        text = normalize(text)
+        best = None
+        for start, keyword in self._automaton.search(text):
+            mode, response = self._rules[keyword]
+            end = start + len(keyword)
+            if mode == EXACT:
+                if start != 0 or end != len(text):
+                    continue
+                rank = 2
+            elif mode == PREFIX:
+                if start != 0 or not _bounded(text, start, end):
+                    continue
+                rank = 1
+            elif not _bounded(text, start, end):
+                continue
+            else:
+                rank = 0
+            candidate = (rank, len(keyword), response)
+            if best is None or candidate[:2] > best[:2]:
+                best = candidate
+        return best[2] if best else None
+
+    async def refresh(self):
+        self.load(await db.list_custom_responses())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # Prefer change notifications; fall back to polling where change streams are unavailable
+        try:
+            async with await db.watch_custom_responses() as stream:
+                await self.refresh()  # pick up writes made before the stream opened
+                async for _ in stream:
+                    await self.refresh()
+        except PyMongoError as e:
+            logging.info(f"Custom response change stream unavailable ({e}); polling every {self.poll_interval}s")
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except PyMongoError as e:
+                logging.warning(f"Custom response refresh failed: {e}")
+
+keyword_index = KeywordIndex(poll_interval=float(os.getenv("KEYWORD_REFRESH_INTERVAL", "60")))
@@ -1,64 +1,92 @@
-def get_magnet_data(url):
-    import requests
-    from bs4 import BeautifulSoup
-    from urllib.parse import quote
-    import textwrap
+import os
+import asyncio
+from urllib.parse import quote
+from audiobookbay.cache import TTLCache
+from audiobookbay.client import fetch, stream
+from audiobookbay.mirrors import mirrors
+from audiobookbay.detail_store import DetailStore
+from audiobookbay.parsers import DetailPageParser, parse_detail_soup
+from audiobookbay.search import catalog
+from audiobookbay.singleflight import upstream
+from backends import shared_backend
+from metrics import stage
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/114.0.0.0 Safari/537.36"
-        )
-    }
+# Stop downloading a detail page once every field has been parsed
+STREAMING = os.getenv("DETAIL_STREAMING", "1") == "1"
 
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, 'html.parser')
+# --- Two-tier detail cache: in-process LRU in front of a local SQLite file ---
+detail_cache = TTLCache(
+    ttl=int(os.getenv("DETAIL_CACHE_TTL", str(24 * 3600))),
+    max_entries=int(os.getenv("DETAIL_CACHE_MAX_ENTRIES", "5000")),
+    max_bytes=int(os.getenv("DETAIL_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    backend=shared_backend,
+    namespace="detail",
+    # A page without an info hash may be a challenge or truncated page: serve it, don't keep it
+    cacheable=lambda data: data is not None and bool(data.get("info_hash"))
+)
+detail_store = DetailStore(
+    os.getenv("DETAIL_STORE_PATH", "detail_cache.sqlite3"),
+    ttl=int(os.getenv("DETAIL_STORE_TTL", str(30 * 24 * 3600)))
+)
 
-    # Title
-    title_tag = soup.find('h1')
-    title = title_tag.get_text(strip=True) if title_tag else 'N/A'
+async def get_magnet_data(url):
+    return await detail_cache.get_or_fetch(url, lambda: _load_magnet_data(url))
 
-    # Image
-    image_url = 'N/A'
-    img_tag = soup.find('img', attrs={'itemprop': 'image'})
-    if img_tag and img_tag.has_attr('src'):
-        image_url = img_tag['src']
-    else:
-        for img in soup.find_all('img'):
-            src = img.get('src', '')
-            if 'm.media-amazon.com' in src or src.endswith(('.jpg', '.jpeg', '.png')):
-                image_url = src
-                break
+async def invalidate_magnet_data(url=None, info_hash=None):
+    links = await asyncio.to_thread(detail_store.invalidate, link=url, info_hash=info_hash)
+    for link in set(links) | ({url} if url else set()):
+        await detail_cache.discard(link)
+    return len(links)
 
-    # Description
-    desc_tag = soup.find(class_='desc')
-    description = desc_tag.get_text(strip=True) if desc_tag else 'N/A'
+async def _load_magnet_data(url):
+    # SQLite I/O (including WAL commits) stays off the event loop thread
+    data = await asyncio.to_thread(detail_store.get, url)
+    if data is None:
+        data = await upstream.do(url, lambda: _scrape_magnet_data(url))
+        if data["info_hash"]:  # see detail_cache's `cacheable`
+            await asyncio.to_thread(detail_store.put, url, data)
+            await asyncio.to_thread(catalog.record_detail, url, data)
+    return data
 
-    # Info Hash and Trackers
-    info_hash = None
-    trackers = []
-    for row in soup.find_all('tr'):
-        cols = row.find_all('td')
-        if len(cols) == 2:
-            key = cols[0].get_text(strip=True)
-            value = cols[1].get_text(strip=True)
-            if "Info Hash" in key:
-                info_hash = value
-            elif "Tracker" in key or value.startswith(("udp://", "http://", "https://")):
-                trackers.append(value)
+async def _scrape_magnet_data(url):
+    # `url` is a canonical link; fetch the same path from whichever mirror is fastest
+    path = mirrors.path(url)
+    if STREAMING:
+        fields = await mirrors.call(path, _stream_detail_fields)
+    else:
+        fields = await mirrors.call(path, _fetch_detail_fields)
+
+    title = fields["title"]
+    info_hash = fields["info_hash"]
 
     # Magnet link
     magnet_link = "N/A"
     if info_hash:
-        tracker_params = ''.join(f"&tr={quote(tr)}" for tr in trackers)
+        tracker_params = ''.join(f"&tr={quote(tr)}" for tr in fields["trackers"])
         magnet_link = f"magnet:?xt=urn:btih:{info_hash}&dn={quote(title)}{tracker_params}"
 
     return {
         "title": title,
-        "image_url": image_url,
-        "description": description,
+        "image_url": fields["image_url"],
+        "description": fields["description"],
+        "info_hash": info_hash,
         "magnet_link": magnet_link
     }
 
+async def _fetch_detail_fields(url):
+    response = await fetch(url)
+    response.raise_for_status()
+    with stage("parse"):
+        return await asyncio.to_thread(parse_detail_soup, response.text)
+
+async def _stream_detail_fields(url):
+    # Feed the page to an incremental parser and hang up as soon as every field is found
+    parser = DetailPageParser()
+    async with stream(url) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_text():
+            parser.feed(chunk)
+            if parser.complete:
+                break
+    parser.close()
+    return parser.result()
@@ -1,4 +1,8 @@
 import os
+import io
+import html
+import time
+import asyncio
 import logging
 import re
 from dotenv import load_dotenv
@@ -8,48 +12,100 @@ from telegram.ext import (
     ApplicationBuilder, CommandHandler, CallbackQueryHandler,
     MessageHandler, ContextTypes, filters, ConversationHandler
 )
-from pymongo import MongoClient
-from audiobookbay.search import search_audiobookbay
-from magnet_scraper import get_magnet_data
 
 # --- Load Env ---
+# Loaded before the local modules below, which read their settings at import time
 load_dotenv()
 
+import db
+from audiobookbay.client import close_client
+from audiobookbay.mirrors import mirrors
+from audiobookbay.resilience import SourceUnavailable
+from audiobookbay.prefetch import prefetcher
+from audiobookbay.search import search_audiobookbay, search_cache, catalog
+from audiobookbay.singleflight import upstream
+from magnet_scraper import get_magnet_data, invalidate_magnet_data, detail_store, detail_cache
+from crawler import crawler, CRAWLER_ENABLED
+from broadcaster import Broadcaster
+from ratelimit import admission, HIGH, LOW
+from backends import shared_backend
+import webhook
+from user_buffer import user_buffer
+from keywords import keyword_index, parse_keyword
+from config_cache import config_cache
+from covers import cover_cache
+import callback_data
+import metrics
+import tracing
+from metrics import handler_scope
+from callback_data import SHOW_PAGE, SELECT, MAGNET, query_handles
+
 # --- Config ---
 TOKEN = os.getenv("BOT_TOKEN")
 LOG_CHANNEL = int(os.getenv("LOG_CHANNEL"))
 REQUEST_GROUP = int(os.getenv("REQUEST_GROUP"))
 ADMINS = list(map(int, os.getenv("ADMINS").split(',')))
-MONGO_URI = os.getenv("MONGO_URI")
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # "polling" or "webhook"
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+
+broadcaster = Broadcaster()
 
-# --- DB Setup ---
-client = MongoClient(MONGO_URI)
-db = client.audiobookbot
-users_collection = db.users
-custom_responses = db.custom_responses
-extra_links_collection = db.extra_links
-settings = db.settings
+UNAVAILABLE = "⚠️ AudioBookBay is unreachable right now. Please try again in a few minutes."
+SLOW_DOWN = "🐢 Slow down! You're sending requests too fast. Please wait a few seconds and try again."
 
 # --- Logging ---
 logging.basicConfig(level=logging.INFO)
 
-# --- State Management ---
-user_states = {}
+# --- Metrics ---
+metrics.track_cache("search", search_cache)
+metrics.track_cache("detail", detail_cache)
+metrics.track("abb_upstream_in_flight", "Distinct upstream fetches in flight", lambda: {(): upstream.stats()["in_flight"]})
+metrics.track(
+    "abb_admission_total", "Admission decisions", lambda: {
+        (k,): v for k, v in admission.stats().items() if k in ("admitted", "queued", "rejected_user", "rejected_global")
+    }, ["decision"], kind=metrics.Counter
+)
+metrics.track(
+    "abb_mirror_latency_seconds", "EWMA latency per mirror",
+    lambda: {(m["url"],): m["latency_ms"] / 1000 for m in mirrors.stats() if m["latency_ms"] is not None}, ["mirror"]
+)
+metrics.track(
+    "abb_mirror_concurrency_limit", "Adaptive concurrency limit per mirror",
+    lambda: {(m["url"],): m["concurrency"] for m in mirrors.stats()}, ["mirror"]
+)
+metrics.track(
+    "abb_mirror_circuit_open", "1 while a mirror's circuit breaker is not closed",
+    lambda: {(m["url"],): int(m["circuit"] != "closed") for m in mirrors.stats()}, ["mirror"]
+)
 
 # --- Helpers ---
 def is_admin(user_id):
     return user_id in ADMINS
 
-def get_keyboard(results, page):
-    buttons = [[InlineKeyboardButton(r['title'], callback_data=f"select|{i}")] for i, r in enumerate(results)]
+def get_keyboard(results, page, handle):
+    buttons = [
+        [InlineKeyboardButton(
+            r['title'], callback_data=callback_data.encode(SELECT, handle, page, i, callback_data.post_id(r['link']))
+        )]
+        for i, r in enumerate(results)
+    ]
     nav = []
     if page > 1:
-        nav.append(InlineKeyboardButton("⬅️ Previous", callback_data="prev"))
-    nav.append(InlineKeyboardButton("➡️ Next", callback_data="next"))
+        nav.append(InlineKeyboardButton("⬅️ Previous", callback_data=callback_data.encode(SHOW_PAGE, handle, page - 1)))
+    nav.append(InlineKeyboardButton("➡️ Next", callback_data=callback_data.encode(SHOW_PAGE, handle, page + 1)))
     if nav:
         buttons.append(nav)
     return InlineKeyboardMarkup(buttons)
 
+async def resolve_post(query, data):
+    """Link of the post on a result or magnet button, or None if it can't be found any more."""
+    link = await asyncio.to_thread(catalog.link_for, data.post)
+    if link is not None:
+        return link
+    # Not in this host's catalog: look for it anywhere on the page the button came from
+    results = await search_audiobookbay(query, data.page)
+    return next((r['link'] for r in results if callback_data.post_id(r['link']) == data.post), None)
+
 async def log_to_channel(text, context):
     try:
         await context.bot.send_message(chat_id=LOG_CHANNEL, text=text)
@@ -58,8 +114,7 @@ async def log_to_channel(text, context):
 
 # --- Commands ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    doc = settings.find_one({"name": "welcome"})
-    welcome_message = doc["message"] if doc else (
+    welcome_message = config_cache.welcome_message or (
         "👋 Welcome to AudiobookBay Search Bot!\n\n"
         "🔍 Just send me the name of an audiobook, and I’ll fetch results for you.\n"
         "➡️ Use the 'Next' and 'Previous' buttons to navigate pages.\n"
@@ -68,8 +123,29 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(welcome_message)
 
 async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    total_users = users_collection.count_documents({})
-    await update.message.reply_text(f"👥 Total users: {total_users}")
+    total_users = await db.count_users()
+    text = f"👥 Total users: {total_users}"
+    if is_admin(update.message.from_user.id):
+        c = search_cache.stats()
+        text += (
+            f"\n🗂 Search cache: {c['entries']} entries, "
+            f"{c['hits']} hits / {c['stale_hits']} stale / {c['misses']} misses"
+        )
+        f = upstream.stats()
+        text += f"\n🔁 Upstream fetches: {f['executed']} run, {f['deduplicated']} deduplicated"
+        a = admission.stats()
+        text += (
+            f"\n🚦 Admission: {a['admitted']} admitted, {a['queued']} queued, "
+            f"{a['rejected_user']} per-user / {a['rejected_global']} global rejections"
+        )
+        text += f"\n📚 Catalog: {await asyncio.to_thread(catalog.count)} posts indexed"
+        text += "\n🪞 Mirrors: " + ", ".join(
+            f"{m['url'].split('//')[-1]} "
+            + (f"{m['latency_ms']}ms" if m["up"] and m["latency_ms"] is not None else "up" if m["up"] else "down")
+            + f" [{m['circuit']}, limit {m['concurrency']}]"
+            for m in mirrors.stats()
+        )
+    await update.message.reply_text(text)
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
@@ -85,6 +161,10 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "/attach 'Text' <link> - Attach extra link\n"
             "/remove <text> - Remove attached link\n"
             "/link - Show all attached links\n"
+            "/purge &lt;link|info hash&gt; - Drop a cached detail page\n"
+            "/metrics - Show latency and counter summary\n"
+            "/traces [n] - Show the n most recent slow requests\n"
+            "/profile [seconds] - Sample where the bot spends its time\n"
             "/cancel - Cancel current operation\n"
         )
     else:
@@ -99,12 +179,11 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.message.from_user.id):
         return
-    msg = update.message.text.split(" ", 1)[1]
-    for user in users_collection.find():
-        try:
-            await context.bot.send_message(user["_id"], msg)
-        except:
-            continue
+    args = update.message.text.split(" ", 1)
+    if len(args) < 2:
+        await update.message.reply_text("Usage: /broadcast <message>")
+        return
+    await broadcaster.start(context.bot, update.effective_chat.id, args[1])
 
 async def send_to_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.message.from_user.id):
@@ -113,8 +192,9 @@ async def send_to_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if len(args) < 3:
         return
     user_id_or_username, msg = args[1], args[2]
-    user = users_collection.find_one({"username": user_id_or_username}) if not user_id_or_username.isdigit() else None
-    user_id = int(user_id_or_username) if user is None else user["_id"]
+    user_id = await db.find_user_id(user_id_or_username) if not user_id_or_username.isdigit() else None
+    if user_id is None:
+        user_id = int(user_id_or_username)
     try:
         await context.bot.send_message(user_id, msg)
     except:
@@ -129,7 +209,8 @@ async def welcome(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return WELCOME_MSG
 
 async def save_welcome(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    settings.update_one({"name": "welcome"}, {"$set": {"message": update.message.text}}, upsert=True)
+    await db.set_welcome_message(update.message.text)
+    await config_cache.invalidate()
     await update.message.reply_text("✅ Welcome message updated.")
     return ConversationHandler.END
 
@@ -138,19 +219,23 @@ CUSTOM_KEYWORD, CUSTOM_RESPONSE = range(2)
 async def custom(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.message.from_user.id):
         return
-    await update.message.reply_text("🔑 Send the keyword to set:")
+    await update.message.reply_text(
+        "🔑 Send the keyword to set:\n"
+        "Start it with 'prefix:' or 'contains:' to match messages that begin with or include it."
+    )
     return CUSTOM_KEYWORD
 
 async def get_custom_response(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data["keyword"] = update.message.text.lower()
+    context.user_data["keyword"] = parse_keyword(update.message.text)
     await update.message.reply_text("💬 Now send the custom response for this keyword:")
     return CUSTOM_RESPONSE
 
 async def save_custom_response(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyword = context.user_data["keyword"]
+    keyword, mode = context.user_data["keyword"]
     response = update.message.text
-    custom_responses.update_one({"keyword": keyword}, {"$set": {"response": response}}, upsert=True)
-    await update.message.reply_text(f"✅ Custom response for keyword '{keyword}' saved.")
+    await db.set_custom_response(keyword, response, mode)
+    await keyword_index.refresh()
+    await update.message.reply_text(f"✅ Custom response for keyword '{keyword}' ({mode} match) saved.")
     return ConversationHandler.END
 
 # --- Cancel ---
@@ -168,7 +253,8 @@ async def attach(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Invalid format. Use:\n/attach 'Text for link' https://example.com")
         return
     text, link = match.groups()
-    extra_links_collection.insert_one({"text": text, "link": link})
+    await db.add_extra_link(text, link)
+    await config_cache.invalidate()
     await update.message.reply_text("✅ Extra link added.")
 
 async def remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -179,8 +265,8 @@ async def remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Usage: /remove 'text'")
         return
     text = args[1].strip()
-    result = extra_links_collection.delete_one({"text": text})
-    if result.deleted_count:
+    if await db.remove_extra_link(text):
+        await config_cache.invalidate()
         await update.message.reply_text("✅ Link removed.")
     else:
         await update.message.reply_text("❌ No matching link found.")
@@ -188,8 +274,8 @@ async def remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def list_links(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.message.from_user.id):
         return
-    links = extra_links_collection.find()
-    if extra_links_collection.count_documents({}) == 0:
+    links = await db.list_extra_links()
+    if not links:
         await update.message.reply_text("No links found.")
         return
     msg = "🔗 <b>Attached Links:</b>\n\n"
@@ -200,7 +286,89 @@ async def list_links(update: Update, context: ContextTypes.DEFAULT_TYPE):
             msg += f"• <b>{text}</b>: <a href=\"{link}\">{link}</a>\n"
     await update.message.reply_text(msg, parse_mode='HTML', disable_web_page_preview=True)
 
+# --- Detail Cache ---
+async def purge(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.message.from_user.id):
+        return
+    args = update.message.text.split(" ", 1)
+    if len(args) < 2:
+        await update.message.reply_text("Usage: /purge <post link|info hash>")
+        return
+    target = args[1].strip()
+    if re.fullmatch(r"[0-9a-fA-F]{40}", target):
+        removed = await invalidate_magnet_data(info_hash=target)
+    else:
+        removed = await invalidate_magnet_data(url=target)
+    await update.message.reply_text(f"🧹 Removed {removed} cached detail page(s).")
+
+# --- Metrics ---
+async def metrics_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.message.from_user.id):
+        return
+    lines = ["📈 <b>Latency</b> (count, mean, ~p95)"]
+    for (handler,), (count, mean, p95) in sorted(metrics.UPDATE_SECONDS.summary().items()):
+        lines.append(f"<b>{handler}</b>: {count}, {mean * 1000:.0f}ms, ≤{p95 * 1000:.0f}ms")
+    for (handler, stage), (count, mean, p95) in sorted(metrics.STAGE_SECONDS.summary().items()):
+        lines.append(f"  {handler}/{stage}: {count}, {mean * 1000:.0f}ms, ≤{p95 * 1000:.0f}ms")
+    searches = sum(v for _, _, v in metrics.SEARCHES.samples())
+    zero = sum(v for _, _, v in metrics.ZERO_RESULTS.samples())
+    errors = sum(v for _, _, v in metrics.ERRORS.samples())
+    c = search_cache.stats()
+    d = detail_cache.stats()
+    lines += [
+        "",
+        f"🔍 Searches: {searches} ({zero} with no results), ❗ errors: {errors}",
+        f"🗂 Search cache: {c['hits'] + c['stale_hits'] + c['shared_hits']} hits / {c['misses']} misses",
+        f"📄 Detail cache: {d['hits'] + d['stale_hits'] + d['shared_hits']} hits / {d['misses']} misses",
+        f"🔁 Upstream fetches in flight: {upstream.stats()['in_flight']}",
+    ]
+    await update.message.reply_text("\n".join(lines), parse_mode='HTML')
+
+async def traces(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.message.from_user.id):
+        return
+    args = update.message.text.split()
+    count = int(args[1]) if len(args) > 1 and args[1].isdigit() else 3
+    recent = list(tracing.slow_traces)[-count:]
+    if not recent:
+        await update.message.reply_text(f"No requests slower than {tracing.TRACE_SLOW_MS:g}ms recorded.")
+        return
+    for finished_at, root in reversed(recent):
+        header = f"🐢 {root.duration * 1000:.0f}ms at {time.strftime('%H:%M:%S', time.localtime(finished_at))}"
+        body = tracing.format_trace(root)
+        if len(body) > 3800:
+            body = body[:3800] + "\n..."
+        await update.message.reply_text(f"{header}\n<pre>{html.escape(body)}</pre>", parse_mode='HTML')
+
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.message.from_user.id):
+        return
+    args = update.message.text.split()
+    if len(args) > 1 and (not args[1].isdigit() or int(args[1]) < 1):
+        await update.message.reply_text("Usage: /profile [seconds], 1 to 60")
+        return
+    seconds = min(int(args[1]), 60) if len(args) > 1 else 10
+    await update.message.reply_text(f"⏱ Profiling for {seconds}s...")
+    try:
+        stacks = await asyncio.to_thread(tracing.profile, seconds)
+    except RuntimeError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    if not stacks:
+        # Telegram rejects empty documents
+        await update.message.reply_text("No samples collected.")
+        return
+    total = sum(stacks.values())
+    lines = [f"📊 {total} samples, busiest functions:"]
+    for function, samples in tracing.top_functions(stacks):
+        lines.append(f"{samples * 100 / total:5.1f}%  {function}")
+    await update.message.reply_text(f"<pre>{html.escape(chr(10).join(lines))}</pre>", parse_mode='HTML')
+    # Collapsed stacks, ready for flamegraph.pl or speedscope
+    collapsed = "\n".join(f"{stack} {samples}" for stack, samples in stacks.most_common())
+    await update.message.reply_document(io.BytesIO(collapsed.encode()), filename=f"profile-{int(time.time())}.txt")
+
 # --- Message Search ---
+@handler_scope("search")
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
     query = update.message.text.strip()
@@ -215,24 +383,33 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("✅ Your request has been forwarded.")
         return
 
-    users_collection.update_one(
-        {"_id": user_id},
-        {"$set": {
-            "username": update.message.from_user.username,
-            "first_name": update.message.from_user.first_name
-        }},
-        upsert=True
-    )
+    user_buffer.note(user_id, update.message.from_user.username, update.message.from_user.first_name)
 
-    custom = custom_responses.find_one({"keyword": lowered})
+    custom = keyword_index.match(lowered)
     if custom:
-        await update.message.reply_text(custom["response"])
+        await update.message.reply_text(custom)
         return
 
-    user_states[user_id] = {'query': query, 'page': 1}
-    results = search_audiobookbay(query, 1)
+    async def notify_queued():
+        await update.message.reply_text("⏳ Lots of searches right now, yours is queued...")
+
+    if not await admission.admit(user_id, HIGH, on_queued=notify_queued):
+        await update.message.reply_text(SLOW_DOWN)
+        return
+
+    metrics.SEARCHES.inc()
+    prefetcher.cancel(user_id)
+    try:
+        results = await search_audiobookbay(query, 1)
+    except SourceUnavailable:
+        await update.message.reply_text(UNAVAILABLE)
+        return
     if not results:
+        metrics.ZERO_RESULTS.inc()
         await update.message.reply_text("No results found.")
+        # An empty answer from a struggling source is not a real "missing book" request
+        if not mirrors.healthy():
+            return
         await context.bot.send_message(
             chat_id=REQUEST_GROUP,
             text=f"📥 Request from <a href='tg://user?id={user_id}'>{user_id}</a>:\n<code>{query}</code>",
@@ -240,37 +417,60 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    user_states[user_id]['results'] = results
+    handle = await query_handles.remember(query)
     await log_to_channel(f"🔍 Search: {query} by {user_id}", context)
     await update.message.reply_text(
         f"🔍 Search Results for '{query}' (Page 1):",
-        reply_markup=get_keyboard(results, 1)
+        reply_markup=get_keyboard(results, 1, handle)
     )
+    prefetcher.schedule(user_id, query, 1, results)
 
 # --- Callback ---
+@handler_scope("callback")
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query_data = update.callback_query.data
     user_id = update.callback_query.from_user.id
-    state = user_states.get(user_id)
+    # Buttons carry everything needed (query handle, page, index, post), so no in-process state is required
+    data = callback_data.decode(update.callback_query.data)
+    query = await query_handles.resolve(data.handle) if data else None
 
-    if not state:
+    if not query:
         await update.callback_query.answer()
         await update.callback_query.message.reply_text("Session expired. Please search again.")
         return
 
-    if query_data == "next":
-        state['page'] += 1
-    elif query_data == "prev" and state['page'] > 1:
-        state['page'] -= 1
-    elif query_data.startswith("select"):
-        _, idx = query_data.split("|")
-        idx = int(idx)
-        result = state['results'][idx]
-        data = get_magnet_data(result['link'])
-        state['selected_data'] = data
+    # Deep pagination yields to first-page searches and result picks
+    priority = LOW if data.action == SHOW_PAGE and data.page > 1 else HIGH
+    if not await admission.admit(user_id, priority):
+        await update.callback_query.answer(SLOW_DOWN, show_alert=True)
+        return
+
+    if data.action == SHOW_PAGE:
+        try:
+            results = await search_audiobookbay(query, data.page)
+        except SourceUnavailable:
+            await update.callback_query.answer(UNAVAILABLE, show_alert=True)
+            return
+        await update.callback_query.message.edit_text(
+            f"🔍 Search Results for '{query}' (Page {data.page}):",
+            reply_markup=get_keyboard(results, data.page, data.handle)
+        )
+        await update.callback_query.answer()
+        prefetcher.schedule(user_id, query, data.page, results)
+        return
+
+    try:
+        link = await resolve_post(query, data)
+        if link is None:
+            await update.callback_query.answer("This result is no longer available. Please search again.", show_alert=True)
+            return
+        details = await get_magnet_data(link)
+    except SourceUnavailable:
+        await update.callback_query.answer(UNAVAILABLE, show_alert=True)
+        return
 
-        title = data.get("title", "")
-        description = data.get("description", "")
+    if data.action == SELECT:
+        title = details.get("title", "")
+        description = details.get("description", "")
         max_caption_length = 1024
         caption = f"<b>{title}</b>\n\n{description}"
         if len(caption) > max_caption_length:
@@ -279,51 +479,81 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             caption = f"<b>{title}</b>\n\n{description}"
 
         keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔗 Get Magnet Link", callback_data="get_magnet")]
+            [InlineKeyboardButton("🔗 Get Magnet Link", callback_data=callback_data.encode(MAGNET, data.handle, data.page, data.index, data.post))]
         ])
-        await update.callback_query.message.reply_photo(
-            photo=data.get("image_url"),
-            caption=caption,
+        await cover_cache.send(
+            update.callback_query.message,
+            details.get("image_url"),
+            caption,
             parse_mode='HTML',
             reply_markup=keyboard
         )
         await update.callback_query.answer()
         return
 
-    elif query_data == "get_magnet":
-        data = state.get('selected_data')
-        if not data:
-            await update.callback_query.answer("No magnet found.", show_alert=True)
-            return
-        magnet = data.get("magnet_link")
-        webtor = f"https://webtor.io/{quote(magnet, safe='')}"
-        extra = extra_links_collection.find_one(sort=[('_id', -1)])
-        extra_button = [InlineKeyboardButton(extra['text'], url=extra['link'])] if extra else []
-
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("▶️ Stream on Webtor", url=webtor)],
-            extra_button
-        ])
-
-        await update.callback_query.message.reply_text(
-            f"🔗 <b>Magnet Link:</b>\n<code>{magnet}</code>",
-            parse_mode='HTML',
-            reply_markup=keyboard
-        )
-        await update.callback_query.answer()
+    magnet = details.get("magnet_link")
+    if not magnet or magnet == "N/A":
+        await update.callback_query.answer("No magnet found.", show_alert=True)
         return
-
-    results = search_audiobookbay(state['query'], state['page'])
-    state['results'] = results
-    await update.callback_query.message.edit_text(
-        f"🔍 Search Results for '{state['query']}' (Page {state['page']}):",
-        reply_markup=get_keyboard(results, state['page'])
+    webtor = f"https://webtor.io/{quote(magnet, safe='')}"
+    extra = config_cache.extra_link
+    extra_button = [InlineKeyboardButton(extra['text'], url=extra['link'])] if extra else []
+
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton("▶️ Stream on Webtor", url=webtor)],
+        extra_button
+    ])
+
+    await update.callback_query.message.reply_text(
+        f"🔗 <b>Magnet Link:</b>\n<code>{magnet}</code>",
+        parse_mode='HTML',
+        reply_markup=keyboard
     )
     await update.callback_query.answer()
 
+# --- Lifecycle ---
+async def on_startup(app):
+    if metrics.METRICS_PORT:
+        await metrics.start_server(metrics.METRICS_PORT + app.bot_data.get("worker", 0))
+    await db.ensure_indexes()
+    mirrors.start()
+    user_buffer.start()
+    await keyword_index.refresh()
+    keyword_index.start()
+    await config_cache.load()
+    config_cache.start()
+    # With webhook workers, only the first one resumes broadcasts so none is sent twice
+    if app.bot_data.get("worker", 0) == 0:
+        resumed = await broadcaster.resume(app.bot)
+        if resumed:
+            logging.info(f"Resumed {resumed} unfinished broadcast(s)")
+        if CRAWLER_ENABLED:
+            crawler.start()
+
+async def on_shutdown(app):
+    await metrics.stop_server()
+    await crawler.stop()
+    await mirrors.stop()
+    await close_client()
+    await keyword_index.stop()
+    await config_cache.stop()
+    await user_buffer.stop()
+    await db.close()
+    detail_store.close()
+    catalog.close()
+    if shared_backend is not None:
+        await shared_backend.close()
+
 # --- Main ---
-def main():
-    app = ApplicationBuilder().token(TOKEN).build()
+def build_application(polling=True):
+    builder = (
+        ApplicationBuilder().token(TOKEN)
+        .request(metrics.TimedRequest(connection_pool_size=256))
+        .post_init(on_startup).post_shutdown(on_shutdown)
+    )
+    if not polling:
+        builder = builder.updater(None)
+    app = builder.build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("stats", stats))
@@ -333,6 +563,11 @@ def main():
     app.add_handler(CommandHandler("attach", attach))
     app.add_handler(CommandHandler("remove", remove))
     app.add_handler(CommandHandler("link", list_links))
+    app.add_handler(CommandHandler("purge", purge))
+    app.add_handler(CommandHandler("metrics", metrics_summary))
+    app.add_handler(CommandHandler("traces", traces))
+    # Runs for up to a minute, so it must not block other updates
+    app.add_handler(CommandHandler("profile", profile, block=False))
 
     app.add_handler(ConversationHandler(
         entry_points=[CommandHandler("welcome", welcome)],
@@ -349,59 +584,27 @@ def main():
         fallbacks=[CommandHandler("cancel", cancel)]
     ))
 
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    app.add_handler(CallbackQueryHandler(handle_callback))
+    # Searches and button presses run as concurrent tasks so one slow scrape never stalls other users
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message, block=False))
+    app.add_handler(CallbackQueryHandler(handle_callback, block=False))
 
+    return app
+
+def main():
+    if BOT_MODE == "webhook":
+        logging.info("Bot is running in webhook mode...")
+        webhook.run(
+            build_application,
+            token=TOKEN,
+            url=WEBHOOK_URL,
+            workers=webhook.workers_from_env(),
+            port=int(os.getenv("PORT", "8080")),
+            path=os.getenv("WEBHOOK_PATH", "telegram"),
+            secret=os.getenv("WEBHOOK_SECRET")
+        )
+        return
     logging.info("Bot is running...")
-    app.run_polling()
+    build_application().run_polling()
 
 if __name__ == "__main__":
     main()
-from aiohttp import web
-import threading
-
-# --- Health check route for Render ---
-async def health(request):
-    return web.Response(text="✅ Bot is alive")
-
-def run_health_server():
-    app = web.Application()
-    app.router.add_get("/", health)
-    web.run_app(app, port=8080)
-
-# --- Main Application Start ---
-if __name__ == '__main__':
-    # Run the web server in a background thread to keep the service alive
-    threading.Thread(target=run_health_server).start()
-
-    # Telegram bot starts here
-    app = ApplicationBuilder().token(TOKEN).build()
-
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("stats", stats))
-    app.add_handler(CommandHandler("broadcast", broadcast))
-    app.add_handler(CommandHandler("send", send_to_user))
-    app.add_handler(CommandHandler("attach", attach))
-    app.add_handler(CommandHandler("remove", remove))
-    app.add_handler(CommandHandler("link", list_links))
-    app.add_handler(CommandHandler("help", help_command))
-
-    app.add_handler(ConversationHandler(
-        entry_points=[CommandHandler("welcome", welcome)],
-        states={WELCOME_MSG: [MessageHandler(filters.TEXT & ~filters.COMMAND, save_welcome)]},
-        fallbacks=[CommandHandler("cancel", cancel)]
-    ))
-
-    app.add_handler(ConversationHandler(
-        entry_points=[CommandHandler("custom", custom)],
-        states={
-            CUSTOM_KEYWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_custom_response)],
-            CUSTOM_RESPONSE: [MessageHandler(filters.TEXT & ~filters.COMMAND, save_custom_response)],
-        },
-        fallbacks=[CommandHandler("cancel", cancel)]
-    ))
-
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    app.add_handler(CallbackQueryHandler(handle_callback))
-
-    app.run_polling()
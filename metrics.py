@@ -0,0 +1,226 @@
+import os
+import time
+import bisect
+import logging
+import functools
+import contextvars
+from contextlib import contextmanager
+from aiohttp import web
+from pymongo import monitoring
+from telegram.request import HTTPXRequest
+import tracing
+
+# --- Minimal Prometheus-compatible metrics ---
+# Every update handler runs inside `handler_scope(name)`; stage timings taken
+# anywhere below it (upstream fetch, parse, Mongo, Telegram sends) are labelled
+# with that handler. Code running outside a handler (prefetch, crawler,
+# broadcasts) is labelled "background". Handlers and stages also open
+# tracing spans (see tracing.py).
+
+current_handler = contextvars.ContextVar("current_handler", default="background")
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name, help, labelnames=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn  # callable returning {label values tuple: value}, for values counted elsewhere
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        values = self.fn() if self.fn else self._values
+        return [(self.name, key, value) for key, value in values.items()]
+
+    def render(self, kind="counter"):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {kind}"]
+        lines += [f"{name}{_labels(self.labelnames, key)} {value}" for name, key, value in self.samples()]
+        return lines
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        self._values[tuple(labels[n] for n in self.labelnames)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        return super().render("gauge")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self):
+        """{label values: (count, mean, approximate p95)} from the bucket counts."""
+        out = {}
+        for key, series in self._series.items():
+            count = sum(series[:-1])
+            if not count:
+                continue
+            target, running, p95 = count * 0.95, 0, float("inf")
+            for bound, n in zip(self.buckets, series):
+                running += n
+                if running >= target:
+                    p95 = bound
+                    break
+            out[key] = (count, series[-1] / count, p95)
+        return out
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            running = 0
+            for bound, n in zip(self.buckets + ("+Inf",), series):
+                running += n
+                le = _labels(self.labelnames + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{le} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+REGISTRY = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        try:
+            lines += metric.render()
+        except Exception as e:  # a failing callback must not take the endpoint down
+            logging.warning(f"Metric {metric.name} failed to render: {e!r}")
+    return "\n".join(lines) + "\n"
+
+# --- Bot metrics ---
+UPDATE_SECONDS = register(Histogram("abb_update_seconds", "Time to handle one update", ["handler"]))
+STAGE_SECONDS = register(Histogram("abb_stage_seconds", "Time spent per stage", ["handler", "stage"]))
+UPDATES_IN_FLIGHT = register(Gauge("abb_updates_in_flight", "Updates being handled right now", ["handler"]))
+SEARCHES = register(Counter("abb_searches_total", "Searches run"))
+ZERO_RESULTS = register(Counter("abb_zero_result_searches_total", "Searches that found nothing"))
+ERRORS = register(Counter("abb_errors_total", "Unhandled errors in update handlers", ["handler"]))
+
+@contextmanager
+def stage(name, **attrs):
+    """Time a stage for the current handler; `attrs` only go on the trace span."""
+    with STAGE_SECONDS.time(handler=current_handler.get(), stage=name), tracing.span(name, **attrs):
+        yield
+
+def handler_scope(name):
+    """Decorator for update handlers: labels stages with `name`, times the update, counts errors."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            token = current_handler.set(name)
+            UPDATES_IN_FLIGHT.inc(handler=name)
+            user = getattr(getattr(args[0], "effective_user", None), "id", None) if args else None
+            try:
+                with UPDATE_SECONDS.time(handler=name), tracing.trace(name, user=user):
+                    return await fn(*args, **kwargs)
+            except Exception:
+                ERRORS.inc(handler=name)
+                raise
+            finally:
+                UPDATES_IN_FLIGHT.dec(handler=name)
+                current_handler.reset(token)
+        return wrapper
+    return decorate
+
+class MongoTimer(monitoring.CommandListener):
+    """Times every Mongo command as a "db" stage of the handler that issued it."""
+
+    def __init__(self):
+        self._started = {}
+
+    def started(self, event):
+        self._started[event.request_id] = (current_handler.get(), tracing.current_span.get())
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        handler, parent = self._started.pop(event.request_id, ("background", None))
+        STAGE_SECONDS.observe(event.duration_micros / 1e6, handler=handler, stage="db")
+        tracing.record(parent, "db", event.duration_micros / 1e6, command=event.command_name)
+
+class TimedRequest(HTTPXRequest):
+    """Bot API transport that records every Telegram call as a "send" stage."""
+
+    async def do_request(self, url, *args, **kwargs):
+        with stage("send", method=url.rsplit("/", 1)[-1]):
+            return await super().do_request(url, *args, **kwargs)
+
+def track_cache(name, cache):
+    register(Counter(
+        f"abb_{name}_cache_requests_total", f"{name.capitalize()} cache lookups by result", ["result"],
+        fn=lambda: {(k,): v for k, v in cache.stats().items() if k in ("hits", "shared_hits", "stale_hits", "misses")}
+    ))
+    register(Gauge(
+        f"abb_{name}_cache_entries", f"Entries in the {name} cache",
+        fn=lambda: {(): len(cache)}
+    ))
+
+def track(name, help, fn, labelnames=(), kind=Gauge):
+    register(kind(name, help, labelnames, fn=fn))
+
+# --- HTTP endpoint ---
+async def _serve_metrics(request):
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+_runner = None
+
+async def start_server(port):
+    global _runner
+    app = web.Application()
+    app.router.add_get("/metrics", _serve_metrics)
+    _runner = web.AppRunner(app)
+    await _runner.setup()
+    await web.TCPSite(_runner, port=port).start()
+    logging.info(f"Metrics on :{port}/metrics")
+
+async def stop_server():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
+
+# 0 disables the endpoint; webhook worker N listens on METRICS_PORT + N
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
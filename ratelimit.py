@@ -0,0 +1,151 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `capacity` tokens."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        # At least one whole token, or acquire() would wait forever when rate < 1
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def try_acquire(self, tokens=1):
+        now = self._refill()
+        if now < self.paused_until or self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def refund(self, tokens=1):
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def delay(self, tokens=1):
+        """Seconds until `tokens` could be acquired."""
+        now = self._refill()
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < tokens:
+            wait = max(wait, (tokens - self.tokens) / self.rate)
+        return wait
+
+    def reserve(self, tokens=1, max_wait=None):
+        """
+        Take `tokens` now, letting the balance go negative, and return the seconds to
+        wait before using them; None (nothing taken) if that would exceed `max_wait`.
+        Callers queued this way push back everyone behind them.
+        """
+        wait = self.delay(tokens)
+        if max_wait is not None and wait > max_wait:
+            return None
+        self.tokens -= tokens
+        return wait
+
+    async def acquire(self, tokens=1):
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay(tokens))
+
+    def pause(self, seconds):
+        """Hold every caller back for `seconds` (e.g. after a flood-control error)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+HIGH, LOW = "high", "low"
+
+class AdmissionController:
+    """
+    Admission control for requests that may hit the upstream site.
+
+    Every user has a small token bucket; all users share a global bucket sized
+    to upstream capacity. High-priority requests (first-page searches, picking
+    a result) may queue up to `max_wait` seconds for a global token. Low-priority
+    ones (deeper pagination) are refused unless `reserve` tokens would remain
+    for high-priority traffic.
+    """
+
+    def __init__(self, user_rate, user_burst, global_rate, global_burst, max_wait=5, reserve=0, max_users=100000):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.max_wait = max_wait
+        self.reserve = reserve
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_user = 0
+        self.rejected_global = 0
+
+    def _user_bucket(self, user_id):
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            bucket = self._users[user_id] = TokenBucket(self.user_rate, self.user_burst)
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return bucket
+
+    async def admit(self, user_id, priority=HIGH, on_queued=None):
+        """Return True once the request may proceed, False if it is refused. `on_queued` is awaited before queueing."""
+        user_bucket = self._user_bucket(user_id)
+        if not user_bucket.try_acquire():
+            self.rejected_user += 1
+            return False
+
+        if priority == LOW:
+            admitted = self.global_bucket.try_acquire(1 + self.reserve)
+            if admitted:
+                self.global_bucket.refund(self.reserve)
+        else:
+            admitted = self.global_bucket.try_acquire()
+            wait = None if admitted else self.global_bucket.reserve(max_wait=self.max_wait)
+            if wait is not None:
+                # The token is already ours; the wait counts everyone queued ahead
+                self.queued += 1
+                try:
+                    if on_queued is not None:
+                        await on_queued()
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    self.global_bucket.refund()
+                    raise
+                admitted = True
+
+        if not admitted:
+            user_bucket.refund()
+            self.rejected_global += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def stats(self):
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_user": self.rejected_user,
+            "rejected_global": self.rejected_global,
+            "global_tokens": int(self.global_bucket.tokens),
+            "users": len(self._users),
+        }
+
+# ADMISSION_GLOBAL_* are totals for the whole bot. Buckets live in each process, so
+# every webhook worker gets an equal share; a user's updates always reach the same
+# worker, so per-user buckets need no splitting.
+_processes = int(os.getenv("WEBHOOK_WORKER_COUNT", "1"))
+admission = AdmissionController(
+    user_rate=float(os.getenv("ADMISSION_USER_RATE", "0.5")),
+    user_burst=int(os.getenv("ADMISSION_USER_BURST", "5")),
+    global_rate=float(os.getenv("ADMISSION_GLOBAL_RATE", "10")) / _processes,
+    global_burst=max(1, -(-int(os.getenv("ADMISSION_GLOBAL_BURST", "20")) // _processes)),
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "5")),
+    reserve=int(os.getenv("ADMISSION_RESERVE", "5")) // _processes
+)
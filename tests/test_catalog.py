@@ -0,0 +1,12 @@
+from audiobookbay.catalog import Catalog, post_id
+
+def test_post_ids_resolve_to_recorded_links(tmp_path):
+    catalog = Catalog(str(tmp_path / "catalog.sqlite3"))
+    link = "https://audiobookbay.lu/abss/dune-messiah/"
+    try:
+        assert catalog.link_for(post_id(link)) is None
+        catalog.record_results([{"title": "Dune Messiah", "link": link, "image": None, "details": "1 GB"}])
+        assert catalog.link_for(post_id(link)) == link
+        assert len(post_id(link)) == 8
+    finally:
+        catalog.close()
@@ -0,0 +1,51 @@
+import pytest
+from audiobookbay.parsers import (
+    DetailPageParser, parse_detail_soup, parse_results_lxml, parse_results_soup, HAVE_LXML
+)
+from benchmarks import fixtures
+
+BASE = "https://audiobookbay.lu"
+SEARCH_PAGES = fixtures.search_pages()
+DETAIL_PAGES = fixtures.detail_pages()
+
+needs_lxml = pytest.mark.skipif(not HAVE_LXML, reason="lxml is not installed")
+
+@needs_lxml
+@pytest.mark.parametrize("name", ["small", "large", "pathological"])
+def test_lxml_results_match_soup(name):
+    html = SEARCH_PAGES[name]
+    results = parse_results_lxml(html, BASE)
+    assert results
+    assert results == parse_results_soup(html, BASE)
+
+@needs_lxml
+def test_lxml_results_past_deep_nesting():
+    # libxml2 stops at 256 nesting levels unless huge_tree is set
+    head, tail = SEARCH_PAGES["small"].split('<div class="post">', 1)
+    html = head + "<div><span>" * 300 + "deep" + "</span></div>" * 300 + '<div class="post">' + tail
+    results = parse_results_lxml(html, BASE)
+    assert len(results) == len(parse_results_soup(SEARCH_PAGES["small"], BASE))
+    assert results == parse_results_soup(html, BASE)
+
+def _feed_in_chunks(html, size):
+    parser = DetailPageParser()
+    for i in range(0, len(html), size):
+        parser.feed(html[i:i + size])
+    parser.close()
+    return parser.result()
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+@pytest.mark.parametrize("name", ["small", "large", "pathological"])
+def test_incremental_detail_matches_soup(name, size):
+    html = DETAIL_PAGES[name]
+    assert _feed_in_chunks(html, size) == parse_detail_soup(html)
+
+@pytest.mark.parametrize("size", [1, 7, 25])
+def test_incremental_detail_keeps_spaces_at_chunk_edges(size):
+    html = (
+        "<h1>The quick brown fox</h1>"
+        "<div class='desc'>The quick brown fox jumps over the lazy dog &amp; cat</div>"
+    )
+    result = _feed_in_chunks(html, size)
+    assert result["title"] == "The quick brown fox"
+    assert result["description"] == "The quick brown fox jumps over the lazy dog & cat"
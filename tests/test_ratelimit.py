@@ -0,0 +1,23 @@
+import time
+import asyncio
+from ratelimit import AdmissionController, HIGH
+
+def test_admission_rejects_once_the_queue_exceeds_max_wait():
+    admission = AdmissionController(
+        user_rate=1, user_burst=1, global_rate=100, global_burst=10, max_wait=0.2
+    )
+
+    async def request(user_id):
+        started = time.monotonic()
+        admitted = await admission.admit(user_id, HIGH)
+        return admitted, time.monotonic() - started
+
+    async def flood():
+        return await asyncio.gather(*(request(user_id) for user_id in range(300)))
+
+    outcomes = asyncio.run(flood())
+    admitted = [waited for ok, waited in outcomes if ok]
+    # The burst plus what refills within max_wait; everyone else is told to slow down
+    assert 10 <= len(admitted) <= 10 + 100 * 0.2 + 2
+    assert admission.rejected_global == 300 - len(admitted)
+    assert max(admitted) < 0.2 + 0.1
@@ -0,0 +1,43 @@
+import asyncio
+from audiobookbay import search
+from audiobookbay.catalog import Catalog
+
+def _post(page, i):
+    return {"title": f"Dune {page}-{i}", "link": f"https://audiobookbay.lu/abss/dune-{page}-{i}/", "image": None, "details": "1 GB"}
+
+def test_catalog_first_goes_live_past_what_the_catalog_holds(tmp_path, monkeypatch):
+    monkeypatch.setattr(search, "catalog", Catalog(str(tmp_path / "catalog.sqlite3"), page_size=10))
+    monkeypatch.setattr(search, "CATALOG_MODE", "first")
+    fetched = []
+
+    async def fetch_results(query, page):
+        # Stands in for the live site: 10 posts per page, recorded like _scrape_results does
+        fetched.append(page)
+        results = [_post(page, i) for i in range(10)]
+        search.catalog.record_results(results)
+        return results
+
+    monkeypatch.setattr(search, "_fetch_results", fetch_results)
+
+    async def browse(pages):
+        return [await search.search_audiobookbay("dune", page) for page in pages]
+
+    async def scenario():
+        search.search_cache.clear()
+        first = await browse([1, 2])
+        search.search_cache.clear()
+        fetched.clear()
+        again = await browse([1, 2, 3, 4])
+        return first, again
+
+    try:
+        first, again = asyncio.run(scenario())
+    finally:
+        search.search_cache.clear()
+        search.catalog.close()
+
+    # Pages 1-2 are answered by the catalog, deeper pages from the live site
+    assert fetched == [3, 4]
+    assert {r["link"] for page in again[:2] for r in page} == {r["link"] for page in first for r in page}
+    assert again[2] == [_post(3, i) for i in range(10)]
+    assert again[3] == [_post(4, i) for i in range(10)]
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import threading
+import contextvars
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# --- Per-update tracing ---
+# Each update handled under metrics.handler_scope() gets a span tree; every
+# metrics stage (upstream fetch, parse, Mongo command, Telegram call) adds a
+# child span. Traces slower than TRACE_SLOW_MS are kept in a ring buffer for /traces.
+
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "2000"))
+TRACE_BUFFER = int(os.getenv("TRACE_BUFFER", "50"))
+MAX_SPANS = 500  # per trace, so one pathological update can't hold unbounded memory
+
+current_span = contextvars.ContextVar("current_span", default=None)
+slow_traces = deque(maxlen=TRACE_BUFFER)
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children", "root", "count")
+
+    def __init__(self, name, attrs, root=None):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+        self.root = root or self
+        self.count = 1  # spans in the tree, tracked on the root
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def child(self, name, attrs):
+        if self.root.count >= MAX_SPANS:
+            return None
+        self.root.count += 1
+        span = Span(name, attrs, self.root)
+        self.children.append(span)
+        return span
+
+@contextmanager
+def trace(name, **attrs):
+    """Root span for one update; kept in `slow_traces` if it ran longer than TRACE_SLOW_MS."""
+    root = Span(name, attrs)
+    token = current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.end = time.perf_counter()
+        current_span.reset(token)
+        if root.duration * 1000 >= TRACE_SLOW_MS:
+            slow_traces.append((time.time(), root))
+
+@contextmanager
+def span(name, **attrs):
+    """Child span of the current one; a no-op outside a trace."""
+    parent = current_span.get()
+    child = parent.child(name, attrs) if parent is not None else None
+    if child is None:
+        yield None
+        return
+    token = current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        current_span.reset(token)
+
+def record(parent, name, duration, **attrs):
+    """Attach an already-finished span (e.g. from a driver callback) to `parent`."""
+    if parent is None:
+        return
+    child = parent.child(name, attrs)
+    if child is not None:
+        child.end = time.perf_counter()
+        child.start = child.end - duration
+
+def format_trace(root, min_ms=1.0):
+    """Indented tree: offset from the trace start, duration, span name and attributes."""
+    lines = []
+
+    def walk(span, depth):
+        offset = (span.start - root.start) * 1000
+        attrs = " ".join(f"{k}={v}" for k, v in span.attrs.items())
+        lines.append(f"{offset:7.0f}ms {span.duration * 1000:7.0f}ms {'  ' * depth}{span.name} {attrs}".rstrip())
+        hidden = 0
+        for child in sorted(span.children, key=lambda s: s.start):
+            if child.duration * 1000 >= min_ms or child.children:
+                walk(child, depth + 1)
+            else:
+                hidden += 1
+        if hidden:
+            lines.append(f"{'':18}{'  ' * (depth + 1)}... {hidden} spans under {min_ms:g}ms")
+
+    walk(root, 0)
+    return "\n".join(lines)
+
+# --- Sampling profiler ---
+_profiling = threading.Lock()
+
+def profile(seconds, interval=0.005):
+    """
+    Sample every thread's stack each `interval` seconds for `seconds`; blocking,
+    run it in a worker thread. Returns a Counter of collapsed stacks
+    ("file:function;file:function" root first), as used by flame graph tools.
+    """
+    if not _profiling.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        me = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks[";".join(reversed(names))] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _profiling.release()
+
+def top_functions(stacks, limit=15):
+    """(function, samples) for the functions most often on top of a stack, ignoring idle waits."""
+    idle = ("selectors.py:select", "threading.py:wait", "queue.py:get", "thread.py:_worker", "tracing.py:profile")
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaf = stack.rsplit(";", 1)[-1]
+        if not leaf.startswith(idle):
+            leaves[leaf] += count
+    return leaves.most_common(limit)
@@ -0,0 +1,106 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+import db
+
+class UserWriteBuffer:
+    """
+    Write-behind buffer for user registrations.
+
+    Remembers the last profile written for each user and only queues a write
+    when a user is new or their username/first name changed. Queued writes are
+    flushed as one unordered bulk upsert every `interval` seconds, as soon as
+    `max_pending` writes are queued, and on shutdown.
+    """
+
+    def __init__(self, interval=5.0, max_pending=1000, max_seen=200000):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_seen = max_seen
+        self._seen = OrderedDict()
+        self._pending = {}
+        self._wake = asyncio.Event()
+        self._task = None
+        self.queued = 0
+        self.skipped = 0
+        self.written = 0
+        self.flushes = 0
+
+    def note(self, user_id, username, first_name):
+        profile = (username, first_name)
+        if self._seen.get(user_id) == profile:
+            self._seen.move_to_end(user_id)
+            self.skipped += 1
+            return
+        self._seen[user_id] = profile
+        self._seen.move_to_end(user_id)
+        if len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        self._pending[user_id] = profile
+        self.queued += 1
+        if len(self._pending) >= self.max_pending:
+            self._wake.set()
+
+    def forget(self, user_ids):
+        """Drop remembered profiles so the next message from these users is written again."""
+        for user_id in user_ids:
+            self._seen.pop(user_id, None)
+
+    async def flush(self):
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            await db.upsert_users(batch)
+        except asyncio.CancelledError:
+            self._requeue(batch)
+            raise
+        except Exception as e:
+            logging.warning(f"User flush failed, requeueing {len(batch)} writes: {e!r}")
+            self._requeue(batch)
+            return 0
+        self.written += len(batch)
+        self.flushes += 1
+        return len(batch)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "queued": self.queued,
+            "skipped": self.skipped,
+            "written": self.written,
+            "flushes": self.flushes,
+        }
+
+    def _requeue(self, batch):
+        for user_id, profile in batch.items():
+            self._pending.setdefault(user_id, profile)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+user_buffer = UserWriteBuffer(
+    interval=float(os.getenv("USER_FLUSH_INTERVAL", "5")),
+    max_pending=int(os.getenv("USER_FLUSH_BATCH", "1000"))
+)
@@ -0,0 +1,95 @@
+import os
+import json
+import asyncio
+import logging
+import multiprocessing
+from aiohttp import web
+from telegram import Bot, Update
+
+# --- Webhook deployment ---
+# One receiver process accepts Telegram's webhook POSTs and fans updates out to
+# N worker processes. Updates are routed by user id, so one user's updates
+# always reach the same worker in the order Telegram sent them.
+
+def route_key(data):
+    for field in ("message", "edited_message", "callback_query", "inline_query",
+                  "chosen_inline_result", "my_chat_member", "chat_member", "chat_join_request"):
+        payload = data.get(field)
+        if payload:
+            sender = payload.get("from") or payload.get("chat") or {}
+            if "id" in sender:
+                return sender["id"]
+    return data.get("update_id", 0)
+
+def _worker(index, queue, build_application):
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(index, queue, build_application))
+
+async def _serve(index, queue, build_application):
+    app = build_application(polling=False)
+    app.bot_data["worker"] = index
+    loop = asyncio.get_running_loop()
+    async with app:
+        if app.post_init:
+            await app.post_init(app)
+        await app.start()
+        logging.info(f"Worker {index} ready")
+        while True:
+            raw = await loop.run_in_executor(None, queue.get)
+            if raw is None:
+                break
+            await app.update_queue.put(Update.de_json(json.loads(raw), app.bot))
+        await app.stop()
+    if app.post_shutdown:
+        await app.post_shutdown(app)
+
+def run(build_application, token, url, workers, port, path="telegram", secret=None):
+    ctx = multiprocessing.get_context("spawn")
+    # Spawned workers inherit this; process-local budgets (ratelimit.admission) split by it
+    os.environ["WEBHOOK_WORKER_COUNT"] = str(workers)
+    queues = [ctx.Queue() for _ in range(workers)]
+    processes = [
+        ctx.Process(target=_worker, args=(i, q, build_application), name=f"bot-worker-{i}", daemon=True)
+        for i, q in enumerate(queues)
+    ]
+    for process in processes:
+        process.start()
+
+    async def receive(request):
+        if secret and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != secret:
+            return web.Response(status=403)
+        raw = await request.text()
+        try:
+            key = route_key(json.loads(raw))
+        except ValueError:
+            return web.Response(status=400)
+        queues[hash(key) % workers].put(raw)
+        return web.Response()
+
+    async def health(request):
+        return web.Response(text="✅ Bot is alive")
+
+    async def on_startup(app):
+        async with Bot(token) as bot:
+            await bot.set_webhook(
+                f"{url.rstrip('/')}/{path}",
+                secret_token=secret,
+                allowed_updates=Update.ALL_TYPES
+            )
+        logging.info(f"Webhook set, fanning out to {workers} workers")
+
+    async def on_cleanup(app):
+        for q in queues:
+            q.put(None)
+        for process in processes:
+            await asyncio.to_thread(process.join, 10)
+
+    app = web.Application()
+    app.router.add_post(f"/{path}", receive)
+    app.router.add_get("/", health)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    web.run_app(app, port=port)
+
+def workers_from_env():
+    return int(os.getenv("WEBHOOK_WORKERS") or os.cpu_count() or 1)